@@ -0,0 +1,191 @@
+"""Run the Simple Material Tool cleanups over many .blend files without opening the UI.
+
+    python BatchMaterialTools.py /assets --steps delete_duplicate_materials,remove_unused_material_slots --jobs 8
+    python BatchMaterialTools.py manifest.txt --report report.jsonl --resume
+
+Every file is processed by its own background Blender (or `bpy` module) process, so a crash
+only costs that file. Results are streamed to a JSON-lines report that --resume reads back.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+REPORT_PREFIX = "MATERIAL_TOOLS_REPORT:"
+STEP_NAMES = (
+    "delete_duplicate_materials", "deduplicate_materials_by_content", "delete_unused_uv_map",
+    "remove_unused_material_slots", "remove_orphan_materials", "auto_link_textures", "random_material",
+)
+DEFAULT_STEPS = ("delete_duplicate_materials", "remove_unused_material_slots", "delete_unused_uv_map")
+# A hung file (stuck import, driver loop) would otherwise hold its worker slot forever
+DEFAULT_TIMEOUT = 1800
+
+
+def worker_steps():
+    import bpy
+    from MaterialTools_V1 import RemoveUnusedData, RandomMaterial, AutoLinkTexture
+
+    return {
+        "delete_duplicate_materials": RemoveUnusedData.delete_duplicate_materials,
+        "deduplicate_materials_by_content": RemoveUnusedData.deduplicate_materials_by_content,
+        "delete_unused_uv_map": RemoveUnusedData.delete_unused_uv_map,
+        "remove_unused_material_slots": RemoveUnusedData.remove_unused_material_slots,
+        "remove_orphan_materials": RemoveUnusedData.remove_orphan_materials,
+        "auto_link_textures": lambda: AutoLinkTexture.auto_link_textures(scope='FILE'),
+        "random_material": lambda: RandomMaterial.assign_random_material(bpy.context),
+    }
+
+
+def run_worker(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bpy
+    import MaterialTools_V1
+
+    start = time.perf_counter()
+    record = {"file": args.file, "status": "ok", "steps": []}
+    bpy.ops.wm.open_mainfile(filepath=args.file, load_ui=False)
+    MaterialTools_V1.register()
+    record["open_seconds"] = round(time.perf_counter() - start, 4)
+
+    # The add-on works on the selection, so a batch run selects everything in the view layer
+    view_layer = bpy.context.view_layer
+    for obj in view_layer.objects:
+        obj.select_set(True)
+    if view_layer.objects.active is None and view_layer.objects:
+        view_layer.objects.active = view_layer.objects[0]
+
+    steps = worker_steps()
+    for name in args.steps:
+        step_start = time.perf_counter()
+        result = steps[name]()
+        record["steps"].append({
+            "step": name,
+            "seconds": round(time.perf_counter() - step_start, 4),
+            "result": result if isinstance(result, (int, float, list, tuple)) else None,
+        })
+    record["materials"] = len(bpy.data.materials)
+    record["objects"] = len(bpy.data.objects)
+
+    if args.save:
+        save_start = time.perf_counter()
+        bpy.ops.wm.save_mainfile(filepath=args.file)
+        record["save_seconds"] = round(time.perf_counter() - save_start, 4)
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    print(REPORT_PREFIX + json.dumps(record), flush=True)
+
+
+def collect_files(source):
+    if os.path.isdir(source):
+        files = []
+        for root, _, names in os.walk(source):
+            files.extend(os.path.join(root, name) for name in names if name.lower().endswith(".blend"))
+        return sorted(files)
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as manifest:
+        lines = [line.strip() for line in manifest]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+
+
+def finished_files(report_path):
+    done = set()
+    if not os.path.exists(report_path):
+        return done
+    with open(report_path, encoding="utf-8") as report:
+        for line in report:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(os.path.abspath(record["file"]))
+    return done
+
+
+def worker_command(args, path):
+    script = os.path.abspath(__file__)
+    worker_args = ["--worker", "--file", path, "--steps", ",".join(args.steps)]
+    if not args.save:
+        worker_args.append("--no-save")
+    if args.bpy_module:
+        return [sys.executable, script] + worker_args
+    return [args.blender, "--background", "--factory-startup", "--python", script, "--"] + worker_args
+
+
+def process_file(args, path):
+    record = None
+    for attempt in range(args.retries + 1):
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(worker_command(args, path), capture_output=True, text=True, timeout=args.timeout or None)
+        except subprocess.TimeoutExpired:
+            record = {"file": path, "status": "failed", "error": f"timed out after {args.timeout}s"}
+            continue
+        line = next((l for l in proc.stdout.splitlines() if l.startswith(REPORT_PREFIX)), None)
+        if proc.returncode == 0 and line:
+            record = json.loads(line[len(REPORT_PREFIX):])
+            record["wall_seconds"] = round(time.perf_counter() - start, 4)
+            record["attempts"] = attempt + 1
+            return record
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-5:]
+        record = {"file": path, "status": "failed", "returncode": proc.returncode, "error": "\n".join(tail)}
+    record["attempts"] = args.retries + 1
+    return record
+
+
+def run_batch(args):
+    files = [os.path.abspath(path) for path in collect_files(args.source)]
+    if args.resume:
+        done = finished_files(args.report)
+        files = [path for path in files if path not in done]
+    print(f"Processing {len(files)} files with {args.jobs} workers")
+
+    failed = 0
+    start = time.perf_counter()
+    with open(args.report, "a", encoding="utf-8") as report, ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(process_file, args, path): path for path in files}
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            failed += record["status"] != "ok"
+            report.write(json.dumps(record) + "\n")
+            report.flush()
+            print(f"[{i}/{len(files)}] {record['status']}: {record['file']}")
+    print(f"Finished {len(files)} files ({failed} failed) in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Batch-run Simple Material Tool cleanups on .blend files")
+    parser.add_argument("source", nargs="?", help="directory to search for .blend files, or a manifest with one path per line")
+    parser.add_argument("--steps", default=",".join(DEFAULT_STEPS), help="comma separated cleanup steps to run in order")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--report", default="material_tools_report.jsonl", help="JSON-lines report to append to")
+    parser.add_argument("--resume", action="store_true", help="skip files already reported as ok")
+    parser.add_argument("--retries", type=int, default=1, help="retries for a crashing or timed out file")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds before a worker is killed, 0 to wait forever")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable")
+    parser.add_argument("--bpy-module", action="store_true", help="run workers with this interpreter and the bpy module")
+    parser.add_argument("--no-save", dest="save", action="store_false", help="do not save the processed files")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.steps = [step for step in args.steps.split(",") if step]
+    unknown = set(args.steps) - set(STEP_NAMES)
+    if unknown:
+        parser.error(f"unknown steps: {', '.join(sorted(unknown))}")
+    if not args.worker and not args.source:
+        parser.error("a directory or manifest is required")
+    return args
+
+
+if __name__ == "__main__":
+    # Inside Blender our arguments follow "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    args = parse_args(argv)
+    if args.worker:
+        run_worker(args)
+    else:
+        sys.exit(run_batch(args))
@@ -0,0 +1,246 @@
+"""Benchmark the Simple Material Tool operators on generated scenes.
+
+    blender -b --factory-startup --python BenchmarkMaterialTools.py -- run --tiers small,medium --output bench.json
+    python BenchmarkMaterialTools.py run --sweep objects=1000,10000,100000 --baseline baseline.json
+    python BenchmarkMaterialTools.py compare bench.json baseline.json
+
+`run` needs Blender or the `bpy` module; `compare` only needs Python.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+TIERS = {
+    "small": {"objects": 200, "meshes": 50, "faces": 400, "slots": 6, "materials": 100, "duplicates": 100, "uv_layers": 3, "image_nodes": 3},
+    "medium": {"objects": 5000, "meshes": 500, "faces": 10000, "slots": 12, "materials": 2000, "duplicates": 2000, "uv_layers": 3, "image_nodes": 4},
+    # Instance heavy: 10M faces in total keeps the tier within workstation memory while the object count stays large
+    "large": {"objects": 50000, "meshes": 200, "faces": 50000, "slots": 24, "materials": 20000, "duplicates": 30000, "uv_layers": 4, "image_nodes": 6},
+}
+OPERATORS = (
+    "delete_duplicate_materials", "deduplicate_materials_by_content", "remove_unused_material_slots",
+    "delete_unused_uv_map", "auto_link_textures", "assign_materials",
+    "random_material_object", "random_material_face",
+)
+TEXTURE_SUFFIXES = ("_albedo", "_roughness", "_metalness", "_normal", "_ao", "_height", "_emissive", "_alpha")
+
+
+def clear_scene():
+    import bpy
+    for name in ("objects", "meshes", "materials", "images", "node_groups"):
+        collection = getattr(bpy.data, name)
+        bpy.data.batch_remove(list(collection))
+
+
+def grid_mesh(name, faces):
+    import bpy
+    import numpy as np
+    side = max(1, int(faces ** 0.5))
+    xs, ys = np.meshgrid(np.arange(side + 1, dtype=np.float32), np.arange(side + 1, dtype=np.float32))
+    coords = np.column_stack((xs.ravel(), ys.ravel(), np.zeros(xs.size, dtype=np.float32)))
+    corner = (np.arange(side)[None, :] + (side + 1) * np.arange(side)[:, None]).ravel()
+    loops = np.column_stack((corner, corner + 1, corner + side + 2, corner + side + 1)).ravel().astype(np.int32)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set("co", coords.ravel())
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", loops)
+    mesh.polygons.add(len(corner))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, len(loops), 4, dtype=np.int32))
+    try:
+        mesh.polygons.foreach_set("loop_total", np.full(len(corner), 4, dtype=np.int32))
+    except (AttributeError, TypeError, RuntimeError):
+        # Read-only since Blender 4.0, derived from loop_start
+        pass
+    mesh.update()
+    return mesh
+
+
+def generate_scene(params, seed=0):
+    import bpy
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    clear_scene()
+
+    materials = []
+    images = {}
+    for i in range(params["materials"]):
+        base = f"Mat_{i}"
+        mat = bpy.data.materials.new(base)
+        mat.use_nodes = True
+        for suffix in TEXTURE_SUFFIXES[:params["image_nodes"]]:
+            image = images.get((i, suffix))
+            if image is None:
+                image = images[(i, suffix)] = bpy.data.images.new(f"{base}{suffix}", 4, 4)
+            node = mat.node_tree.nodes.new('ShaderNodeTexImage')
+            node.image = image
+        materials.append(mat)
+    # .NNN copies, every fourth one chained (Mat_3.001.002) and some without their base material
+    base_count = params["materials"]
+    for i in range(params["duplicates"]):
+        source = materials[i % base_count]
+        copy = source.copy()
+        copy.name = f"{source.name}.{i // base_count + 1:03d}" + (".002" if i % 4 == 3 else "")
+        materials.append(copy)
+    for mat in materials[:params["materials"] // 20]:
+        mat.name = f"{mat.name}.900"
+
+    meshes = []
+    for i in range(params["meshes"]):
+        mesh = grid_mesh(f"Mesh_{i}", params["faces"])
+        for k in range(params["uv_layers"]):
+            mesh.uv_layers.new(name="UVMap" if k == 0 else f"UVMap_{k}")
+        picks = rng.integers(0, len(materials), params["slots"])
+        # Repeat a slot so merging has work, and leave the upper half of the slots unused
+        picks[-1] = picks[0]
+        for pick in picks.tolist():
+            mesh.materials.append(materials[pick])
+        used = max(1, params["slots"] // 2)
+        indices = rng.integers(0, used, len(mesh.polygons)).astype(np.int32)
+        mesh.polygons.foreach_set("material_index", indices)
+        mesh.update()
+        meshes.append(mesh)
+
+    collection = bpy.context.scene.collection
+    for i in range(params["objects"]):
+        obj = bpy.data.objects.new(f"Prop_{i // 10}.{i % 10:03d}", meshes[i % len(meshes)])
+        collection.objects.link(obj)
+        obj.select_set(True)
+    if collection.objects:
+        bpy.context.view_layer.objects.active = collection.objects[0]
+
+
+def random_material(mode):
+    import bpy
+    from MaterialTools_V1 import RandomMaterial
+    bpy.context.scene.material_tools.random_material_mode = mode
+    return RandomMaterial.assign_random_material(bpy.context)
+
+
+def operator_calls():
+    import bpy
+    from MaterialTools_V1 import RemoveUnusedData, AutoLinkTexture
+    return {
+        "delete_duplicate_materials": RemoveUnusedData.delete_duplicate_materials,
+        "deduplicate_materials_by_content": RemoveUnusedData.deduplicate_materials_by_content,
+        "remove_unused_material_slots": RemoveUnusedData.remove_unused_material_slots,
+        "delete_unused_uv_map": RemoveUnusedData.delete_unused_uv_map,
+        "auto_link_textures": lambda: AutoLinkTexture.auto_link_textures(scope='FILE'),
+        "assign_materials": bpy.ops.object.assign_materials,
+        "random_material_object": lambda: random_material('OBJECT'),
+        "random_material_face": lambda: random_material('FACE'),
+    }
+
+
+def build_tiers(args):
+    tiers = {}
+    for name in args.tiers.split(","):
+        if name:
+            tiers[name] = dict(TIERS[name])
+    if args.tier_config:
+        with open(args.tier_config, encoding="utf-8") as f:
+            for name, params in json.load(f).items():
+                tiers[name] = {**TIERS["small"], **params}
+    if args.sweep:
+        # objects=100,1000,10000 varies one parameter of the base tier
+        param, _, values = args.sweep.partition("=")
+        if param not in TIERS["small"]:
+            raise SystemExit(f"unknown sweep parameter: {param}")
+        for value in values.split(","):
+            tiers[f"{args.base_tier}-{param}={value}"] = {**TIERS[args.base_tier], param: int(value)}
+    return tiers
+
+
+def run(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bpy
+    import MakeMaterialByName
+    import MaterialTools_V1
+    MaterialTools_V1.register()
+    MakeMaterialByName.register()
+    material_tools = bpy.context.scene.material_tools
+    material_tools.random_use_seed = True
+    # Generated materials are all named Mat_*
+    material_tools.random_material_prefix = "Mat_"
+
+    calls = operator_calls()
+    operators = [name for name in args.operators.split(",") if name]
+    results = []
+    for tier, params in build_tiers(args).items():
+        for name in operators:
+            timings = []
+            for repeat in range(args.repeat):
+                generate_scene(params, seed=repeat)
+                # Caches keyed by pointer would otherwise carry hits over from the previous scene,
+                # rebuilding them the way opening a file does keeps the index build out of the timing
+                MaterialTools_V1.material_tools_load_post()
+                gc.collect()
+                start = time.perf_counter()
+                calls[name]()
+                timings.append(time.perf_counter() - start)
+            results.append({"tier": tier, "operator": name, "seconds": min(timings), "runs": timings, "params": params})
+            print(f"{tier:>24} {name:>34} {min(timings):10.4f}s")
+
+    report = {"blender": bpy.app.version_string, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            return compare(report, json.load(f), args.threshold, args.min_delta)
+    return 0
+
+
+def compare(current, baseline, threshold, min_delta):
+    reference = {(r["tier"], r["operator"]): r["seconds"] for r in baseline["results"]}
+    regressions = 0
+    for result in current["results"]:
+        key = (result["tier"], result["operator"])
+        if key not in reference:
+            print(f"{key[0]:>24} {key[1]:>34} {result['seconds']:10.4f}s  (new)")
+            continue
+        before, after = reference[key], result["seconds"]
+        ratio = after / before if before else float("inf")
+        regressed = ratio > threshold and after - before > min_delta
+        regressions += regressed
+        print(f"{key[0]:>24} {key[1]:>34} {before:10.4f}s -> {after:10.4f}s  x{ratio:5.2f}{'  REGRESSION' if regressed else ''}")
+    print(f"{regressions} regressions")
+    return 1 if regressions else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark Simple Material Tool operators")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="generate scenes and time the operators (needs bpy)")
+    run_parser.add_argument("--tiers", default="small", help=f"comma separated tiers from {', '.join(TIERS)}")
+    run_parser.add_argument("--tier-config", help="JSON file of extra tiers, missing parameters come from 'small'")
+    run_parser.add_argument("--sweep", help="PARAM=V1,V2,... to vary one parameter of --base-tier")
+    run_parser.add_argument("--base-tier", default="small", choices=sorted(TIERS))
+    run_parser.add_argument("--operators", default=",".join(OPERATORS), help="comma separated operators to time")
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per operator, the fastest is reported")
+    run_parser.add_argument("--output", help="write results to this JSON file")
+    run_parser.add_argument("--baseline", help="compare against this results file")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+        sub.add_argument("--min-delta", type=float, default=0.01, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        unknown = {name for name in args.operators.split(",") if name} - set(OPERATORS)
+        if unknown:
+            parser.error(f"unknown operators: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    args = parse_args(argv)
+    if args.command == "compare":
+        with open(args.current, encoding="utf-8") as current, open(args.baseline, encoding="utf-8") as baseline:
+            sys.exit(compare(json.load(current), json.load(baseline), args.threshold, args.min_delta))
+    sys.exit(run(args))
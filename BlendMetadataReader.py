@@ -0,0 +1,333 @@
+"""List the materials and images in .blend files without starting Blender.
+
+    python BlendMetadataReader.py /assets --db blend_index.sqlite --jobs 8
+    python BlendMetadataReader.py /assets --db blend_index.sqlite --list duplicates > needs_dedupe.txt
+    python BatchMaterialTools.py needs_dedupe.txt --steps delete_duplicate_materials
+
+Only the file-block headers and the SDNA are parsed, just enough to read the ID names, user counts
+and image paths. Files whose size and mtime are unchanged since the last run are skipped, so the
+SQLite index is updated incrementally. gzip files are read with the standard library, zstd files
+need Python 3.14 or the `zstandard` package.
+"""
+
+import argparse
+import gzip
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from BatchMaterialTools import collect_files
+
+DUPLICATE_SUFFIX = re.compile(r'(?:\.\d{3,})+$')
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ID_CODES = {b"MA": "materials", b"IM": "images"}
+# Linked IDs are written as bare ID structs under this block code
+LINK_PLACEHOLDER = b"ID"
+LIB_FAKEUSER = 1 << 9
+# Bumped when stored rows would be read differently, older indexes are rebuilt
+INDEX_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, version INTEGER, status TEXT, error TEXT, scanned TEXT
+);
+CREATE TABLE IF NOT EXISTS materials (
+    file TEXT, name TEXT, base TEXT, users INTEGER, fake_user INTEGER, linked INTEGER
+);
+CREATE TABLE IF NOT EXISTS images (
+    file TEXT, name TEXT, filepath TEXT, users INTEGER, fake_user INTEGER, packed INTEGER, linked INTEGER, missing INTEGER
+);
+CREATE INDEX IF NOT EXISTS materials_file ON materials (file);
+CREATE INDEX IF NOT EXISTS materials_base ON materials (base);
+CREATE INDEX IF NOT EXISTS images_file ON images (file);
+CREATE VIEW IF NOT EXISTS duplicate_materials AS
+    SELECT file, base, COUNT(*) AS copies FROM materials WHERE linked = 0 GROUP BY file, base HAVING COUNT(*) > 1;
+"""
+QUERIES = {
+    "duplicates": "SELECT DISTINCT file FROM duplicate_materials ORDER BY file",
+    "missing-images": "SELECT DISTINCT file FROM images WHERE missing = 1 ORDER BY file",
+    "failed": "SELECT path FROM files WHERE status != 'ok' ORDER BY path",
+}
+
+
+def zstd_decompress(data):
+    try:
+        from compression import zstd
+        return zstd.decompress(data)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compressed file, install the zstandard package") from None
+    with zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True) as reader:
+        return reader.read()
+
+
+def load(path):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+        if magic.startswith(GZIP_MAGIC):
+            f.seek(0)
+            return gzip.decompress(f.read())
+        if magic == ZSTD_MAGIC:
+            f.seek(0)
+            return zstd_decompress(f.read())
+        # Uncompressed files are only paged in where headers and ID blocks are read
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def parse_header(data):
+    if data[:7] != b"BLENDER":
+        raise ValueError("not a .blend file")
+    if data[7:9].isdigit():
+        # BLENDER17-01v0500: header size, format version, endianness, Blender version
+        size = int(data[7:9])
+        endian = "<" if data[12:13] == b"v" else ">"
+        return {"size": size, "endian": endian, "pointer": 8, "version": int(data[13:17]), "bhead": endian + "4siQqq", "large": True}
+    pointer = 8 if data[7:8] == b"-" else 4
+    endian = "<" if data[8:9] == b"v" else ">"
+    bhead = endian + ("4siQii" if pointer == 8 else "4siIii")
+    return {"size": 12, "endian": endian, "pointer": pointer, "version": int(data[9:12]), "bhead": bhead, "large": False}
+
+
+def read_blocks(data, header):
+    bhead = struct.Struct(header["bhead"])
+    offset = header["size"]
+    dna = None
+    blocks = []
+    while offset + bhead.size <= len(data):
+        if header["large"]:
+            code, sdna, _, length, _ = bhead.unpack_from(data, offset)
+        else:
+            code, length, _, sdna, _ = bhead.unpack_from(data, offset)
+        offset += bhead.size
+        code = code.rstrip(b"\0")
+        if code == b"ENDB":
+            break
+        if code == b"DNA1":
+            dna = offset
+        elif code in ID_CODES or code == LINK_PLACEHOLDER:
+            blocks.append((code, offset, sdna))
+        offset += length
+    if dna is None:
+        raise ValueError("no SDNA block")
+    return blocks, dna
+
+
+def parse_sdna(data, offset, endian):
+    def expect(tag, pos):
+        if data[pos:pos + 4] != tag:
+            raise ValueError(f"SDNA: expected {tag!r}")
+        return pos + 4
+
+    def strings(pos):
+        (count,) = struct.unpack_from(endian + "i", data, pos)
+        pos += 4
+        values = []
+        for _ in range(count):
+            end = data.find(b"\0", pos)
+            values.append(data[pos:end].decode("ascii"))
+            pos = end + 1
+        return values, (pos + 3) & ~3
+
+    pos = expect(b"NAME", expect(b"SDNA", offset))
+    names, pos = strings(pos)
+    types, pos = strings(expect(b"TYPE", pos))
+    pos = expect(b"TLEN", pos)
+    lengths = struct.unpack_from(f"{endian}{len(types)}h", data, pos)
+    pos = expect(b"STRC", (pos + 2 * len(types) + 3) & ~3)
+    (count,) = struct.unpack_from(endian + "i", data, pos)
+    pos += 4
+    structs = []
+    for _ in range(count):
+        type_index, field_count = struct.unpack_from(endian + "hh", data, pos)
+        fields = struct.unpack_from(f"{endian}{2 * field_count}h", data, pos + 4)
+        structs.append((types[type_index], [(types[fields[i]], names[fields[i + 1]]) for i in range(0, len(fields), 2)]))
+        pos += 4 + 4 * field_count
+    return {"types": types, "lengths": lengths, "structs": structs, "by_type": {name: i for i, (name, _) in enumerate(structs)}}
+
+
+def struct_fields(sdna, type_name, pointer, cache):
+    # DNA structs are padded explicitly, so offsets are plain running sums
+    if type_name not in cache:
+        fields = {}
+        offset = 0
+        type_lengths = dict(zip(sdna["types"], sdna["lengths"]))
+        for field_type, name in sdna["structs"][sdna["by_type"][type_name]][1]:
+            count = 1
+            for dim in re.findall(r"\[(\d+)\]", name):
+                count *= int(dim)
+            size = (pointer if "*" in name else type_lengths[field_type]) * count
+            fields[re.sub(r"\[.*|[*()]", "", name)] = (offset, size, field_type)
+            offset += size
+        cache[type_name] = fields
+    return cache[type_name]
+
+
+def field(sdna, type_name, path, pointer, cache):
+    offset = 0
+    for part in path.split("."):
+        fields = struct_fields(sdna, type_name, pointer, cache)
+        if part not in fields:
+            return None
+        start, size, type_name = fields[part]
+        offset += start
+    return offset, size
+
+
+def read_file(path):
+    record = {"path": path, "size": None, "mtime_ns": None, "materials": [], "images": []}
+    try:
+        stat = os.stat(path)
+        record["size"], record["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        data = load(path)
+        try:
+            header = parse_header(data)
+            blocks, dna = read_blocks(data, header)
+            sdna = parse_sdna(data, dna, header["endian"])
+            record["version"] = header["version"]
+            read_ids(data, header, sdna, blocks, record)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def read_ids(data, header, sdna, blocks, record):
+    endian, pointer = header["endian"], header["pointer"]
+    pointer_format = endian + ("Q" if pointer == 8 else "I")
+    cache = {}
+    layouts = {}
+    folder = os.path.dirname(record["path"])
+
+    def string(block, location):
+        raw = data[block + location[0]:block + location[0] + location[1]]
+        return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+    def number(block, location, fmt):
+        return struct.unpack_from(endian + fmt, data, block + location[0])[0]
+
+    for code, offset, sdna_index in blocks:
+        type_name = sdna["structs"][sdna_index][0]
+        if type_name not in layouts:
+            prefix = "id." if type_name != "ID" else ""
+            layouts[type_name] = {
+                "name": field(sdna, type_name, prefix + "name", pointer, cache),
+                "us": field(sdna, type_name, prefix + "us", pointer, cache),
+                "flag": field(sdna, type_name, prefix + "flag", pointer, cache),
+                "lib": field(sdna, type_name, prefix + "lib", pointer, cache),
+                # Renamed from "name" in later versions
+                "filepath": field(sdna, type_name, "filepath", pointer, cache) or (field(sdna, type_name, "name", pointer, cache) if type_name == "Image" else None),
+                "packedfile": field(sdna, type_name, "packedfile", pointer, cache),
+                "packedfiles": field(sdna, type_name, "packedfiles", pointer, cache),
+            }
+        layout = layouts[type_name]
+        full_name = string(offset, layout["name"])
+        id_code = full_name[:2].encode()
+        if code == LINK_PLACEHOLDER and id_code not in ID_CODES:
+            continue
+        name = full_name[2:]
+        users = number(offset, layout["us"], "i")
+        fake_user = bool(number(offset, layout["flag"], "h") & LIB_FAKEUSER)
+        linked = code == LINK_PLACEHOLDER or bool(struct.unpack_from(pointer_format, data, offset + layout["lib"][0])[0])
+        if ID_CODES[id_code] == "materials":
+            record["materials"].append((name, DUPLICATE_SUFFIX.sub("", name) or name, users, fake_user, linked))
+            continue
+        filepath = string(offset, layout["filepath"]) if layout["filepath"] and type_name == "Image" else ""
+        packed = any(layout[key] and struct.unpack_from(pointer_format, data, offset + layout[key][0])[0]
+                     for key in ("packedfile", "packedfiles"))
+        missing = None
+        if filepath and not packed and not linked and "<" not in filepath:
+            resolved = os.path.join(folder, filepath[2:]) if filepath.startswith("//") else filepath
+            missing = not os.path.exists(os.path.normpath(resolved.replace("\\", "/")))
+        record["images"].append((name, filepath, users, fake_user, packed, linked, missing))
+
+
+def stale_files(db, files):
+    known = {path: (size, mtime) for path, size, mtime in db.execute("SELECT path, size, mtime_ns FROM files WHERE status = 'ok'")}
+    stale = []
+    for path in files:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+            stale.append(path)
+    return stale
+
+
+def store(db, record):
+    path = record["path"]
+    db.execute("DELETE FROM materials WHERE file = ?", (path,))
+    db.execute("DELETE FROM images WHERE file = ?", (path,))
+    db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", (
+        path, record["size"], record["mtime_ns"], record.get("version"), "failed" if "error" in record else "ok",
+        record.get("error"), time.strftime("%Y-%m-%dT%H:%M:%S"),
+    ))
+    db.executemany("INSERT INTO materials VALUES (?, ?, ?, ?, ?, ?)", [(path, *row) for row in record["materials"]])
+    db.executemany("INSERT INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(path, *row) for row in record["images"]])
+
+
+def prune(db):
+    gone = [(path,) for (path,) in db.execute("SELECT path FROM files") if not os.path.exists(path)]
+    for table, column in (("files", "path"), ("materials", "file"), ("images", "file")):
+        db.executemany(f"DELETE FROM {table} WHERE {column} = ?", gone)
+    return len(gone)
+
+
+def run_index(args):
+    db = sqlite3.connect(args.db)
+    db.executescript(SCHEMA)
+    if db.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+        for table in ("files", "materials", "images"):
+            db.execute(f"DELETE FROM {table}")
+        db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        db.commit()
+    if args.source:
+        files = [os.path.abspath(path) for path in collect_files(args.source)]
+        stale = stale_files(db, files)
+        print(f"Reading {len(stale)} of {len(files)} files with {args.jobs} workers", file=sys.stderr)
+        failed = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            for i, record in enumerate(pool.map(read_file, stale, chunksize=16), 1):
+                failed += "error" in record
+                store(db, record)
+                if i % 500 == 0:
+                    db.commit()
+                    print(f"[{i}/{len(stale)}]", file=sys.stderr)
+        db.commit()
+        print(f"Indexed {len(stale)} files ({failed} failed) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if args.prune:
+        print(f"Pruned {prune(db)} missing files", file=sys.stderr)
+        db.commit()
+    if args.list:
+        for (path,) in db.execute(QUERIES[args.list]):
+            print(path)
+    db.close()
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Index materials and images of .blend files into SQLite")
+    parser.add_argument("source", nargs="?", help="directory to search for .blend files, or a manifest with one path per line")
+    parser.add_argument("--db", default="blend_index.sqlite", help="SQLite index to update")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="number of reader processes")
+    parser.add_argument("--prune", action="store_true", help="drop files from the index that no longer exist")
+    parser.add_argument("--list", choices=sorted(QUERIES), help="print indexed files that need this cleanup, one per line")
+    args = parser.parse_args(argv)
+    if not (args.source or args.prune or args.list):
+        parser.error("a directory or manifest, --prune or --list is required")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(run_index(parse_args(sys.argv[1:])))
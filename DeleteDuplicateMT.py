@@ -1,12 +1,45 @@
 import bpy
+import re
+import time
 
-mats = bpy.data.materials
+start = time.perf_counter()
+suffix = re.compile(r'(?:\.\d{3,})+$')
 
-for mat in mats:
-    (original, _, ext) = mat.name.rpartition(".")
-    
-    if ext.isnumeric() and mats.find(original) != -1:
-        print("%s -> %s" %(mat.name, original))
-        
-        mat.user_remap(mats[original])
-        mats.remove(mat)
\ No newline at end of file
+# Index every local material once and group Mat, Mat.001, Mat.001.002, ... by base name
+by_name = {mat.name: mat for mat in bpy.data.materials if mat.library is None}
+groups = {}
+for name, mat in by_name.items():
+    groups.setdefault(suffix.sub("", name) or name, []).append(mat)
+
+remap = {}
+for base, group in groups.items():
+    if len(group) < 2:
+        continue
+    # Fall back to the shortest suffix chain when the base material does not exist
+    survivor = by_name.get(base) or min(group, key=lambda m: (len(m.name), m.name))
+    for mat in group:
+        if mat != survivor:
+            print("%s -> %s" % (mat.name, survivor.name))
+            remap[mat] = survivor
+
+# Swap material slots directly, then let user_remap handle whatever else still references a duplicate
+for attr in ("meshes", "curves", "metaballs", "grease_pencils", "volumes", "pointclouds", "hair_curves"):
+    for data in getattr(bpy.data, attr, ()):
+        if data.library is not None:
+            continue
+        for i, mat in enumerate(data.materials):
+            if mat in remap:
+                data.materials[i] = remap[mat]
+
+for obj in bpy.data.objects:
+    for slot in obj.material_slots:
+        if slot.link == 'OBJECT' and slot.material in remap:
+            slot.material = remap[slot.material]
+
+for mat, survivor in remap.items():
+    if mat.users > int(mat.use_fake_user):
+        mat.user_remap(survivor)
+
+bpy.data.batch_remove(tuple(remap))
+
+print("Collapsed %d duplicate materials in %.2fs" % (len(remap), time.perf_counter() - start))
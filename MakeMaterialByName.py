@@ -1,12 +1,19 @@
 import bpy
 import re
 
+NAME_PATTERN = re.compile(r'^(\w+)(?:\.\d+)?$')
+
 class MaterialAssignmentProperties(bpy.types.PropertyGroup):
     prefix: bpy.props.StringProperty(
         name="Material Prefix",
         description="Prefix for material names",
         default="T_"
     )
+    template: bpy.props.PointerProperty(
+        name="Template",
+        description="Material copied, node tree included, for every new material instead of starting empty",
+        type=bpy.types.Material
+    )
 
 class OBJECT_OT_assign_materials(bpy.types.Operator):
     bl_idname = "object.assign_materials"
@@ -14,34 +21,58 @@ class OBJECT_OT_assign_materials(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        prefix = context.scene.material_assignment_props.prefix
+        props = context.scene.material_assignment_props
+        prefix = props.prefix
+
+        # Group the selection by base name in one pass
+        groups = {}
+        for obj in context.selected_objects:
+            if obj.type == 'MESH':
+                match = NAME_PATTERN.match(obj.name)
+                if match:
+                    groups.setdefault(match.group(1), []).append(obj)
 
-        def create_material_slot(name):
-            mat = bpy.data.materials.get(name)
+        # Create each material once, cloning the template when there is one
+        existing = {mat.name: mat for mat in bpy.data.materials if mat.library is None}
+        created = 0
+        assignments = {}
+        for base_name, objects in groups.items():
+            name = f"{prefix}{base_name}"
+            mat = existing.get(name)
             if mat is None:
-                mat = bpy.data.materials.new(name=name)
-            return mat
+                if props.template:
+                    mat = props.template.copy()
+                    mat.name = name
+                else:
+                    mat = bpy.data.materials.new(name=name)
+                existing[name] = mat
+                created += 1
+            for obj in objects:
+                assignments.setdefault(obj.data, []).append((obj, mat))
 
-        def assign_material_slot(obj, mat_name):
-            if obj.data.materials:
-                obj.data.materials[0] = create_material_slot(mat_name)
+        # A mesh only takes the material itself when every one of its users gets that same material,
+        # otherwise each object links its own so instances never overwrite each other
+        assigned = 0
+        for mesh, pairs in assignments.items():
+            materials = {mat for _, mat in pairs}
+            if mesh.users == len(pairs) and len(materials) == 1:
+                mat = materials.pop()
+                if mesh.materials:
+                    mesh.materials[0] = mat
+                else:
+                    mesh.materials.append(mat)
+                for obj, _ in pairs:
+                    obj.material_slots[0].link = 'DATA'
             else:
-                obj.data.materials.append(create_material_slot(mat_name))
-
-        material_map = {}
-        pattern = r'^(\w+)(?:\.\d+)?$'
-        selected_objects = context.selected_objects
-
-        for obj in selected_objects:
-            if obj.type == 'MESH':
-                match = re.match(pattern, obj.name)
-                if match:
-                    base_name = match.group(1)
-                    if base_name not in material_map:
-                        material_map[base_name] = f"{prefix}{base_name}"
-                    assign_material_slot(obj, material_map[base_name])
+                if not mesh.materials:
+                    mesh.materials.append(None)
+                for obj, mat in pairs:
+                    slot = obj.material_slots[0]
+                    slot.link = 'OBJECT'
+                    slot.material = mat
+            assigned += len(pairs)
 
-        self.report({'INFO'}, f"Material slots assigned to {len(selected_objects)} objects!")
+        self.report({'INFO'}, f"Material slots assigned to {assigned} objects, {created} materials created!")
         return {'FINISHED'}
 
 class VIEW3D_PT_material_assignment(bpy.types.Panel):
@@ -55,6 +86,7 @@ class VIEW3D_PT_material_assignment(bpy.types.Panel):
         props = context.scene.material_assignment_props
 
         layout.prop(props, "prefix")
+        layout.prop(props, "template")
         layout.operator("object.assign_materials")
 
 classes = (
@@ -8,132 +8,2018 @@ bl_info = {
 }
 
 import bpy
-import random
+import cProfile
+import functools
+import hashlib
+import json
+import mmap
+import numpy as np
 import os
+import pstats
+import re
+import time
+import zlib
+from bpy.app.handlers import persistent
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+DUPLICATE_SUFFIX = re.compile(r'(?:\.\d{3,})+$')
+MATERIAL_OWNER_COLLECTIONS = ("meshes", "curves", "metaballs", "grease_pencils", "volumes", "pointclouds", "hair_curves")
+MATERIAL_FINGERPRINT_SETTINGS = (
+    "use_nodes", "blend_method", "shadow_method", "surface_render_method", "displacement_method",
+    "use_backface_culling", "alpha_threshold", "pass_index", "diffuse_color", "metallic", "roughness",
+)
+UV_NODE_PROPERTIES = ("uv_map", "attribute_name")
+UV_MODIFIER_PROPERTIES = ("uv_layer", "mask_tex_uv_layer")
+# Marks consumers that read whichever UV map is active for rendering
+DEFAULT_UV = ""
+AUTO_LINK_CHANNELS = ("base_color", "roughness", "metalness", "normal", "emissive", "alpha", "ao", "height", "orm")
+AUTO_LINK_DEFAULT_SUFFIXES = {
+    "base_color": "_albedo",
+    "roughness": "_roughness",
+    "metalness": "_metalness",
+    "normal": "_normal",
+    "emissive": "_emissive",
+    "alpha": "_alpha",
+    "ao": "_ao",
+    "height": "_height",
+    "orm": "_orm",
+}
+NON_COLOR_CHANNELS = frozenset(("roughness", "metalness", "normal", "ao", "height", "orm"))
+SEPARATE_COLOR_NODE = 'ShaderNodeSeparateColor' if hasattr(bpy.types, 'ShaderNodeSeparateColor') else 'ShaderNodeSeparateRGB'
+MIX_COLOR_NODE = 'ShaderNodeMix' if hasattr(bpy.types, 'ShaderNodeMix') else 'ShaderNodeMixRGB'
+AO_MIX_LABEL = "Ambient Occlusion"
+TEXTURE_EXTENSIONS = frozenset((".png", ".jpg", ".jpeg", ".tif", ".tiff", ".exr", ".hdr", ".tga", ".bmp", ".webp", ".dds"))
+TEXTURE_MAGIC = (
+    (b"\x89PNG", "PNG"), (b"\xff\xd8\xff", "JPEG"), (b"II*\x00", "TIFF"), (b"MM\x00*", "TIFF"),
+    (b"v/1\x01", "OPEN_EXR"), (b"#?RADIANCE", "HDR"), (b"#?RGBE", "HDR"), (b"BM", "BMP"), (b"DDS ", "DDS"),
+)
+HASH_CHUNK = 1 << 24
+CHECKPOINT_PROPERTY = "material_tools_checkpoints"
+CHECKPOINT_INTERVAL = 1.0
+ORM_CHANNELS = ("ao", "roughness", "metalness")
+# Full resolution maps held in memory at once by the texture tools
+TEXTURE_BATCH = 8
+PROXY_PATH_PROPERTY = "material_tools_proxy"
+FULL_PATH_PROPERTY = "material_tools_full_path"
+PROXY_MIN_SIZE = 256
+LANCZOS_LOBES = 3
+# Brushes, palettes and line styles are used by tools and render settings that hold no ID reference
+GC_ROOT_COLLECTIONS = ("scenes", "window_managers", "workspaces", "screens", "brushes", "palettes", "linestyles")
+GC_TYPES = (
+    ('materials', "Materials", "Unreachable materials"),
+    ('images', "Images", "Unreachable images"),
+    ('node_groups', "Node Groups", "Unreachable node groups"),
+    ('meshes', "Meshes", "Unreachable meshes"),
+    ('textures', "Textures", "Unreachable textures"),
+)
+GC_KEEP_NODES = frozenset(('OUTPUT_MATERIAL', 'OUTPUT_AOV', 'OUTPUT_LIGHT', 'OUTPUT_WORLD', 'FRAME'))
+NODE_BASE_PROPERTIES = frozenset(prop.identifier for prop in bpy.types.Node.bl_rna.properties)
+# Node -> CurveMapping -> CurveMap -> CurveMapPoint is the deepest struct chain a shader node holds
+STRUCT_FINGERPRINT_DEPTH = 4
+STRUCT_FINGERPRINT_SKIP = frozenset(("rna_type", "select", "frame_current"))
+
+# as_pointer() -> (name, fingerprint), dropped when a material changes or is removed
+material_fingerprints = {}
+# Images switched to full resolution for a render or a save, switched back when it is done
+proxy_render = {"images": [], "done": True}
+proxy_save = {"images": {}, "scenes": []}
+# mesh pointer -> ((face count, slot material pointers), faces per slot), material pointer -> mesh pointers
+material_usage = {}
+material_users = {}
+# mesh pointer -> object names, object name -> (mesh pointer, object-linked material pointers),
+# material pointer -> names of objects linking it in an object slot
+mesh_objects = {}
+object_links = {}
+material_objects = {}
+# Meshes edited since they were last cleaned or still holding dead or duplicate slots
+dirty_meshes = set()
+
+class MaterialToolsCache:
+    @staticmethod
+    def path(name):
+        folder = os.path.join(bpy.utils.user_resource('CONFIG'), "material_tools")
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+    @staticmethod
+    def load_json(name, default):
+        try:
+            with open(MaterialToolsCache.path(name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    @staticmethod
+    def save_json(name, data):
+        path = MaterialToolsCache.path(name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+class Profiler:
+    current = None
+    last = None
+    stack = []
+
+    @staticmethod
+    def timed(phase):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if Profiler.current is None:
+                    return function(*args, **kwargs)
+                # Phases are exclusive: a nested phase pauses the one that called it
+                now = time.perf_counter()
+                if Profiler.stack:
+                    Profiler.add_phase(*Profiler.stack[-1], now)
+                Profiler.stack.append([phase, now])
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    now = time.perf_counter()
+                    Profiler.add_phase(*Profiler.stack.pop(), now)
+                    if Profiler.stack:
+                        Profiler.stack[-1][1] = now
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def add_phase(phase, start, end):
+        phases = Profiler.current["phases"]
+        phases[phase] = phases.get(phase, 0.0) + end - start
+
+    @staticmethod
+    def count(name, amount=1):
+        if Profiler.current is not None:
+            counters = Profiler.current["counters"]
+            counters[name] = counters.get(name, 0) + amount
+
+    @staticmethod
+    def begin(op, context):
+        run = {
+            "operator": op.bl_idname,
+            "file": bpy.data.filepath,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": 0.0,
+            "phases": {},
+            "counters": {},
+        }
+        return run, cProfile.Profile() if context.scene.material_tools.profile_enabled else None
+
+    @staticmethod
+    @contextmanager
+    def active(run, profile):
+        # Modal operators enter this once per chunk, so "seconds" only counts time spent working
+        Profiler.current = run
+        Profiler.stack = []
+        start = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield run
+        finally:
+            if profile:
+                profile.disable()
+            run["seconds"] += time.perf_counter() - start
+            Profiler.current = None
+
+    @staticmethod
+    def end(op, context, run, profile):
+        if profile:
+            run["profile"] = Profiler.top_functions(profile)
+        Profiler.last = run
+        Profiler.write_log(context.scene.material_tools, run, profile)
+        # The operator reports its own result, the breakdown goes to the console and the Stats panel
+        print(Profiler.summary(run))
+
+    @staticmethod
+    @contextmanager
+    def operator(op, context):
+        run, profile = Profiler.begin(op, context)
+        try:
+            with Profiler.active(run, profile):
+                yield run
+        finally:
+            Profiler.end(op, context, run, profile)
+
+    @staticmethod
+    def top_functions(profile, limit=15):
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [[f"{os.path.basename(file)}:{line}({name})", calls, round(own, 6), round(total, 6)]
+                for (file, line, name), (_, calls, own, total, _) in rows]
+
+    @staticmethod
+    def write_log(material_tools, run, profile):
+        path = bpy.path.abspath(material_tools.profile_log_path) if material_tools.profile_log_path else MaterialToolsCache.path("profile.jsonl")
+        try:
+            if profile:
+                run["profile_path"] = "%s.%s.prof" % (os.path.splitext(path)[0], time.strftime("%Y%m%d-%H%M%S"))
+                profile.dump_stats(run["profile_path"])
+            with open(path, "a", encoding="utf-8") as log:
+                log.write(json.dumps(run) + "\n")
+        except OSError as e:
+            print(f"Could not write profile log {path}: {e}")
+
+    @staticmethod
+    def summary(run):
+        phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in run["phases"].items())
+        counters = ", ".join(f"{name} {value}" for name, value in run["counters"].items())
+        return f"{run['operator']}: {run['seconds']:.3f}s" + (f" | {phases}" if phases else "") + (f" | {counters}" if counters else "")
+
+class MaterialUsageIndex:
+    # Built on load, or on first use after an undo or enabling the add-on, then kept current by the depsgraph handler
+    built = False
+
+    @staticmethod
+    def signature(mesh):
+        return len(mesh.polygons), tuple(mat.as_pointer() if mat else 0 for mat in mesh.materials)
+
+    @staticmethod
+    def lookup(mesh):
+        key = mesh.as_pointer()
+        entry = material_usage.get(key)
+        if entry and entry[0] == MaterialUsageIndex.signature(mesh):
+            Profiler.count("index hits")
+            return entry[1]
+        Profiler.count("index misses")
+        MaterialUsageIndex.discard(key)
+        return None
+
+    @staticmethod
+    def store(mesh, indices):
+        key = mesh.as_pointer()
+        MaterialUsageIndex.discard(key)
+        signature = MaterialUsageIndex.signature(mesh)
+        counts = np.bincount(indices, minlength=len(signature[1]))
+        material_usage[key] = (signature, counts)
+        for mat in set(signature[1]) - {0}:
+            material_users.setdefault(mat, set()).add(key)
+        return counts
+
+    @staticmethod
+    def discard(key):
+        entry = material_usage.pop(key, None)
+        if entry:
+            for mat in entry[0][1]:
+                material_users.get(mat, set()).discard(key)
+
+    @staticmethod
+    def is_used(mat):
+        key = mat.as_pointer()
+        return bool(material_users.get(key) or material_objects.get(key))
+
+    @staticmethod
+    def clear():
+        material_usage.clear()
+        material_users.clear()
+        mesh_objects.clear()
+        object_links.clear()
+        material_objects.clear()
+        dirty_meshes.clear()
+        MaterialUsageIndex.built = False
+
+    @staticmethod
+    def forget_object(name):
+        key, materials = object_links.pop(name, (None, ()))
+        mesh_objects.get(key, set()).discard(name)
+        for mat in materials:
+            material_objects.get(mat, set()).discard(name)
+
+    @staticmethod
+    def add_object(obj):
+        name = obj.name
+        MaterialUsageIndex.forget_object(name)
+        key = obj.data.as_pointer()
+        materials = {slot.material.as_pointer() for slot in obj.material_slots if slot.link == 'OBJECT' and slot.material}
+        object_links[name] = (key, materials)
+        mesh_objects.setdefault(key, set()).add(name)
+        for mat in materials:
+            material_objects.setdefault(mat, set()).add(name)
+        return key
+
+    @staticmethod
+    def mark_mesh(mesh):
+        key = mesh.as_pointer()
+        MaterialUsageIndex.discard(key)
+        if MaterialUsageIndex.built and mesh.library is None:
+            dirty_meshes.add(key)
+
+    @staticmethod
+    def mark_object(obj):
+        if MaterialUsageIndex.built:
+            MaterialUsageIndex.add_object(obj)
+            if obj.data.library is None:
+                dirty_meshes.add(obj.data.as_pointer())
+
+    @staticmethod
+    def remove_mesh(key):
+        MaterialUsageIndex.discard(key)
+        dirty_meshes.discard(key)
+        for name in mesh_objects.pop(key, ()):
+            MaterialUsageIndex.forget_object(name)
+
+    @staticmethod
+    def users(mesh):
+        key = mesh.as_pointer()
+        objects = bpy.data.objects
+        users = [objects[name] for name in mesh_objects.get(key, ()) if name in objects and objects[name].data == mesh]
+        # Renamed or deleted objects leave stale names, a full scan sorts them out when the count does not add up
+        if len(users) != mesh.users - int(mesh.use_fake_user):
+            users = [obj for obj in objects if obj.data == mesh]
+            for obj in users:
+                MaterialUsageIndex.add_object(obj)
+        return users
+
+    @staticmethod
+    def is_clean(mesh, counts, users):
+        keys = RemoveUnusedData.slot_keys(mesh, users)
+        return bool(counts.all()) and len(set(keys)) == len(keys)
+
+    @staticmethod
+    @Profiler.timed("index")
+    def build():
+        MaterialUsageIndex.clear()
+        meshes = {}
+        for obj in bpy.data.objects:
+            if obj.type == 'MESH':
+                MaterialUsageIndex.add_object(obj)
+                meshes.setdefault(obj.data, []).append(obj)
+        for mesh, users in meshes.items():
+            if mesh.library is not None or not mesh.materials:
+                continue
+            indices = RemoveUnusedData.read_material_indices(mesh)
+            np.clip(indices, 0, len(mesh.materials) - 1, out=indices)
+            counts = MaterialUsageIndex.store(mesh, indices)
+            if not MaterialUsageIndex.is_clean(mesh, counts, users):
+                dirty_meshes.add(mesh.as_pointer())
+        MaterialUsageIndex.built = True
+        Profiler.count("meshes indexed", len(meshes))
+
+    @staticmethod
+    def ensure():
+        if not MaterialUsageIndex.built:
+            MaterialUsageIndex.build()
+
+    @staticmethod
+    def dirty_selection():
+        # Only meshes edited since they were cleaned are visited, through a selected object using them
+        MaterialUsageIndex.ensure()
+        objects = bpy.data.objects
+        found = []
+        for key in list(dirty_meshes):
+            names = [name for name in mesh_objects.get(key, ()) if name in objects]
+            users = [objects[name] for name in names if objects[name].type == 'MESH' and objects[name].data.as_pointer() == key]
+            if not users:
+                continue
+            users = MaterialUsageIndex.users(users[0].data)
+            selected = [obj for obj in users if obj.select_get()]
+            if selected:
+                found.append((selected[0], users))
+        Profiler.count("dirty meshes", len(dirty_meshes))
+        return found
 
 class RemoveUnusedData:
+    @staticmethod
+    def base_material_name(name):
+        return DUPLICATE_SUFFIX.sub("", name) or name
+
+    @staticmethod
+    @Profiler.timed("scan")
+    def find_duplicate_materials():
+        by_name = {mat.name: mat for mat in bpy.data.materials if mat.library is None}
+        Profiler.count("materials", len(by_name))
+        groups = {}
+        for name, mat in by_name.items():
+            groups.setdefault(RemoveUnusedData.base_material_name(name), []).append(mat)
+        remap = {}
+        for base, group in groups.items():
+            if len(group) < 2:
+                continue
+            # Without a base material, keep the shortest suffix chain: Mat.001 wins over Mat.001.002
+            survivor = by_name.get(base) or min(group, key=lambda m: (len(m.name), m.name))
+            for mat in group:
+                if mat != survivor:
+                    remap[mat] = survivor
+        return remap
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def remap_materials(remap):
+        if not remap:
+            return 0
+        for attr in MATERIAL_OWNER_COLLECTIONS:
+            for data in getattr(bpy.data, attr, ()):
+                if data.library is not None:
+                    continue
+                materials = data.materials
+                for i, mat in enumerate(materials):
+                    if mat in remap:
+                        materials[i] = remap[mat]
+        for obj in bpy.data.objects:
+            for slot in obj.material_slots:
+                if slot.link == 'OBJECT' and slot.material in remap:
+                    slot.material = remap[slot.material]
+        # Anything still holding a loser (node sockets, drivers, ...) goes through the generic remap
+        for mat, survivor in remap.items():
+            if mat.users > int(mat.use_fake_user):
+                mat.user_remap(survivor)
+        for mat in remap:
+            material_fingerprints.pop(mat.as_pointer(), None)
+        bpy.data.batch_remove(tuple(remap))
+        Profiler.count("materials removed", len(remap))
+        return len(remap)
+
     @staticmethod
     def delete_duplicate_materials():
-        mats = bpy.data.materials
-        for mat in mats:
-            (original, _, ext) = mat.name.rpartition(".")
-            if ext.isnumeric() and mats.find(original) != -1:
-                print("%s -> %s" % (mat.name, original))
-                mat.user_remap(mats[original])
-                mats.remove(mat)
+        count = RemoveUnusedData.remap_materials(RemoveUnusedData.find_duplicate_materials())
+        print(f"Collapsed {count} duplicate materials.")
+        return count
+
+    @staticmethod
+    def fingerprint_value(value, groups=None):
+        if value is None or isinstance(value, (bool, int, str)):
+            return value
+        if isinstance(value, float):
+            return round(value, 6)
+        if isinstance(value, bpy.types.Image):
+            if value.source in {'FILE', 'TILED', 'SEQUENCE', 'MOVIE'} and value.filepath and not value.packed_file:
+                path = os.path.normcase(os.path.normpath(bpy.path.abspath(value.filepath, library=value.library)))
+                return ("IMAGE", path, value.source, value.colorspace_settings.name, value.alpha_mode)
+            return ("IMAGE", value.name)
+        if isinstance(value, bpy.types.NodeTree):
+            return ("GROUP", RemoveUnusedData.tree_fingerprint(value, groups))
+        if isinstance(value, bpy.types.ID):
+            return (type(value).__name__, value.name)
+        try:
+            return tuple(RemoveUnusedData.fingerprint_value(v, groups) for v in value)
+        except TypeError:
+            return None
+
+    @staticmethod
+    def struct_fingerprint(struct, groups=None, depth=0):
+        # Color ramps, curve mappings, image users and texture mappings are hashed by content
+        if depth > STRUCT_FINGERPRINT_DEPTH:
+            raise ValueError(f"{type(struct).__name__} nests too deep to fingerprint")
+        values = []
+        for prop in struct.bl_rna.properties:
+            key = prop.identifier
+            if key in STRUCT_FINGERPRINT_SKIP:
+                continue
+            value = getattr(struct, key, None)
+            if prop.type == 'COLLECTION':
+                value = tuple(RemoveUnusedData.struct_fingerprint(item, groups, depth + 1) for item in value)
+            elif prop.type == 'POINTER' and value is not None and not isinstance(value, bpy.types.ID):
+                value = RemoveUnusedData.struct_fingerprint(value, groups, depth + 1)
+            else:
+                value = RemoveUnusedData.fingerprint_value(value, groups)
+            values.append((key, value))
+        return (type(struct).__name__, tuple(values))
+
+    @staticmethod
+    def tree_fingerprint(tree, groups=None):
+        # groups memoizes node group hashes by pointer for the length of one scan
+        if groups is None:
+            groups = {}
+        tree_key = tree.as_pointer()
+        if tree_key in groups:
+            return groups[tree_key]
+        groups[tree_key] = None
+        incoming = {}
+        for link in tree.links:
+            if link.is_valid:
+                key = (link.to_node.name, link.to_socket.identifier)
+                incoming.setdefault(key, []).append(link)
+        node_hashes = {}
+
+        def node_hash(node):
+            if node.name in node_hashes:
+                return node_hashes[node.name]
+            node_hashes[node.name] = None
+            props = []
+            for prop in node.bl_rna.properties:
+                key = prop.identifier
+                if key in NODE_BASE_PROPERTIES or prop.type == 'COLLECTION':
+                    continue
+                value = getattr(node, key, None)
+                if prop.type == 'POINTER' and value is not None and not isinstance(value, bpy.types.ID):
+                    try:
+                        value = RemoveUnusedData.struct_fingerprint(value, groups)
+                    except ValueError:
+                        # Never merge what cannot be compared: the node pointer makes the tree unique
+                        value = ("UNHASHABLE", node.as_pointer())
+                    props.append((key, value))
+                    continue
+                props.append((key, RemoveUnusedData.fingerprint_value(value, groups)))
+            inputs = []
+            for socket in node.inputs:
+                links = incoming.get((node.name, socket.identifier))
+                if links:
+                    upstream = sorted((node_hash(l.from_node), l.from_socket.identifier, getattr(l, "is_muted", False)) for l in links)
+                    inputs.append((socket.identifier, "LINK", tuple(upstream)))
+                else:
+                    inputs.append((socket.identifier, RemoveUnusedData.fingerprint_value(getattr(socket, "default_value", None), groups)))
+            digest = hashlib.sha1(repr((node.bl_idname, node.mute, props, inputs)).encode()).hexdigest()
+            node_hashes[node.name] = digest
+            return digest
+
+        # Node names and layout do not matter, only the multiset of node hashes
+        hashes = sorted(node_hash(node) for node in tree.nodes if node.bl_idname != 'NodeFrame')
+        groups[tree_key] = hashlib.sha1(repr(hashes).encode()).hexdigest()
+        return groups[tree_key]
+
+    @staticmethod
+    def material_fingerprint(mat, groups=None):
+        key = mat.as_pointer()
+        cached = material_fingerprints.get(key)
+        if cached and cached[0] == mat.name:
+            return cached[1]
+        settings = tuple(RemoveUnusedData.fingerprint_value(getattr(mat, attr, None)) for attr in MATERIAL_FINGERPRINT_SETTINGS)
+        tree = RemoveUnusedData.tree_fingerprint(mat.node_tree, groups) if mat.use_nodes and mat.node_tree else None
+        fingerprint = hashlib.sha1(repr((settings, tree)).encode()).hexdigest()
+        material_fingerprints[key] = (mat.name, fingerprint)
+        return fingerprint
+
+    @staticmethod
+    @Profiler.timed("scan")
+    def find_content_duplicates():
+        groups = {}
+        node_groups = {}
+        for mat in bpy.data.materials:
+            if mat.library is not None or getattr(mat, "is_grease_pencil", False):
+                continue
+            groups.setdefault(RemoveUnusedData.material_fingerprint(mat, node_groups), []).append(mat)
+        Profiler.count("materials", sum(len(group) for group in groups.values()))
+        remap = {}
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            survivor = min(group, key=lambda m: (len(m.name), m.name))
+            for mat in group:
+                if mat != survivor:
+                    remap[mat] = survivor
+        return remap
+
+    @staticmethod
+    def deduplicate_materials_by_content():
+        count = RemoveUnusedData.remap_materials(RemoveUnusedData.find_content_duplicates())
+        print(f"Merged {count} materials with identical content.")
+        return count
+
+    @staticmethod
+    def file_digest(path):
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    for offset in range(0, len(view), HASH_CHUNK):
+                        digest.update(view[offset:offset + HASH_CHUNK])
+                    view.release()
+        return digest.hexdigest()
+
+    @staticmethod
+    @Profiler.timed("hash")
+    def file_digests(stats):
+        cache = MaterialToolsCache.load_json("image_hashes.json", {})
+        digests = {}
+        missing = []
+        for path, (size, mtime) in stats.items():
+            cached = cache.get(path)
+            if cached and cached[0] == size and cached[1] == mtime:
+                digests[path] = cached[2]
+            else:
+                missing.append(path)
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 2)) as pool:
+                for path, digest in zip(missing, pool.map(RemoveUnusedData.file_digest, missing)):
+                    digests[path] = digest
+                    cache[path] = [*stats[path], digest]
+            MaterialToolsCache.save_json("image_hashes.json", cache)
+        return digests
+
+    @staticmethod
+    @Profiler.timed("scan")
+    def find_duplicate_images():
+        by_key = {}
+        for img in bpy.data.images:
+            # Unsaved paint or edits only live in that image's buffer, merging it would throw them away
+            if img.library is not None or img.source != 'FILE' or not img.filepath or img.packed_file or img.is_dirty:
+                continue
+            path = os.path.normcase(os.path.realpath(bpy.path.abspath(img.filepath, library=img.library)))
+            # Same pixels read with different color settings are different images
+            by_key.setdefault((path, img.colorspace_settings.name, img.alpha_mode), []).append(img)
+            Profiler.count("images")
+        survivors = {key: min(group, key=lambda i: (len(i.name), i.name)) for key, group in by_key.items()}
+        remap = {img: survivors[key] for key, group in by_key.items() for img in group if img != survivors[key]}
+
+        # Distinct paths can still be byte-identical copies; only files sharing a size need hashing
+        stats = {}
+        for path, _, _ in survivors:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (stat.st_size, stat.st_mtime_ns)
+        sizes = {}
+        for path, (size, _) in stats.items():
+            sizes.setdefault(size, []).append(path)
+        candidates = {path: stats[path] for paths in sizes.values() if len(paths) > 1 for path in paths}
+        digests = RemoveUnusedData.file_digests(candidates)
+        by_content = {}
+        for (path, colorspace, alpha_mode), img in survivors.items():
+            if path in digests:
+                by_content.setdefault((digests[path], colorspace, alpha_mode), []).append(img)
+        for group in by_content.values():
+            survivor = min(group, key=lambda i: (len(i.name), i.name))
+            for img in group:
+                if img != survivor:
+                    remap[img] = survivor
+        for img, survivor in remap.items():
+            while survivor in remap:
+                survivor = remap[survivor]
+            remap[img] = survivor
+        return remap
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def remap_images(remap):
+        if not remap:
+            return 0
+        owners = list(bpy.data.materials) + list(bpy.data.worlds) + list(bpy.data.lights)
+        trees = [owner.node_tree for owner in owners if owner.library is None and owner.node_tree]
+        trees.extend(group for group in bpy.data.node_groups if group.library is None)
+        for tree in trees:
+            for node in tree.nodes:
+                image = getattr(node, "image", None)
+                if image in remap:
+                    node.image = remap[image]
+        for img, survivor in remap.items():
+            if img.users > int(img.use_fake_user):
+                img.user_remap(survivor)
+        bpy.data.batch_remove(tuple(remap))
+        Profiler.count("images removed", len(remap))
+        return len(remap)
+
+    @staticmethod
+    def deduplicate_images():
+        remap = RemoveUnusedData.find_duplicate_images()
+        reclaimed = 0
+        for img in remap:
+            if img.has_data:
+                width, height = img.size
+                reclaimed += width * height * img.channels * (4 if img.is_float else 1)
+        count = RemoveUnusedData.remap_images(remap)
+        print(f"Merged {count} duplicate images.")
+        return count, reclaimed
+
+    @staticmethod
+    def tree_uv_references(tree, cache):
+        if tree in cache:
+            return cache[tree]
+        refs = cache[tree] = set()
+        geometry = tree.bl_idname == 'GeometryNodeTree'
+        for node in tree.nodes:
+            if geometry:
+                # Named Attribute and friends take the attribute name as a string input
+                refs.update(socket.default_value for socket in node.inputs
+                            if socket.type == 'STRING' and not socket.is_linked and socket.default_value)
+            for attr in UV_NODE_PROPERTIES:
+                name = getattr(node, attr, None)
+                if name:
+                    refs.add(name)
+                elif name == "" and attr == "uv_map":
+                    refs.add(DEFAULT_UV)
+            if node.type == 'TEX_IMAGE' and not node.inputs['Vector'].is_linked:
+                refs.add(DEFAULT_UV)
+            elif node.type == 'TEX_COORD' and node.outputs['UV'].is_linked:
+                refs.add(DEFAULT_UV)
+            elif node.type == 'GROUP' and node.node_tree:
+                refs |= RemoveUnusedData.tree_uv_references(node.node_tree, cache)
+        return refs
+
+    @staticmethod
+    @Profiler.timed("scan")
+    def collect_uv_references(meshes, remap=None):
+        # With a remap, references are those of the materials left after the remap is applied
+        remap = remap or {}
+        tree_cache = {}
+        material_refs = {}
+
+        def refs_for(mat):
+            if mat is None:
+                return set()
+            mat = remap.get(mat, mat)
+            if mat not in material_refs:
+                tree = mat.node_tree if mat.use_nodes else None
+                material_refs[mat] = RemoveUnusedData.tree_uv_references(tree, tree_cache) if tree else set()
+            return material_refs[mat]
+
+        referenced = {mesh: set() for mesh in meshes}
+        for mesh, refs in referenced.items():
+            for mat in mesh.materials:
+                refs |= refs_for(mat)
+        # Every instance counts, selected or not: their modifiers and object-linked materials read the same layers
+        for obj in bpy.data.objects:
+            refs = referenced.get(obj.data) if obj.type == 'MESH' else None
+            if refs is None:
+                continue
+            for slot in obj.material_slots:
+                if slot.link == 'OBJECT':
+                    refs |= refs_for(slot.material)
+            for modifier in obj.modifiers:
+                for attr in UV_MODIFIER_PROPERTIES:
+                    name = getattr(modifier, attr, None)
+                    if name:
+                        refs.add(name)
+                if modifier.type == 'NODES':
+                    # Inputs set to an attribute are stored as "<identifier>_attribute_name", string inputs as plain values
+                    refs.update(value for value in modifier.values() if isinstance(value, str) and value)
+                    if modifier.node_group:
+                        refs |= RemoveUnusedData.tree_uv_references(modifier.node_group, tree_cache)
+        return referenced
+
+    @staticmethod
+    @Profiler.timed("plan")
+    def unused_uv_layers(mesh, referenced):
+        uv_layers = mesh.uv_layers
+        keep = {uv_layers[0].name}
+        keep.update(name for name in uv_layers.keys() if name in referenced)
+        if DEFAULT_UV in referenced:
+            keep.update(layer.name for layer in uv_layers if layer.active_render)
+        return [layer.name for layer in uv_layers if layer.name not in keep]
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def remove_uv_layers(mesh, names, referenced):
+        uv_layers = mesh.uv_layers
+        reset_active = uv_layers.active is None or uv_layers.active.name in names
+        for name in names:
+            uv_layers.remove(uv_layers[name])
+        if reset_active:
+            uv_layers.active_index = 0
+        first = uv_layers[0]
+        if first.name not in referenced and "UVMap" not in uv_layers.keys():
+            first.name = "UVMap"
+        return len(names)
+
+    @staticmethod
+    def selected_uv_meshes(context):
+        meshes = {obj.data for obj in context.selected_objects
+                  if obj.type == 'MESH' and obj.data.library is None and obj.data.uv_layers}
+        Profiler.count("meshes", len(meshes))
+        return meshes
+
+    @staticmethod
+    def clean_uv_layers(mesh, referenced):
+        removed = RemoveUnusedData.remove_uv_layers(mesh, RemoveUnusedData.unused_uv_layers(mesh, referenced), referenced)
+        Profiler.count("uv maps removed", removed)
+        return removed
 
     @staticmethod
     def delete_unused_uv_map():
-        selected_objects = bpy.context.selected_objects
-        for obj in selected_objects:
-            if obj.type == 'MESH' and obj.data.uv_layers:
-                uv_layers = obj.data.uv_layers
-                active_uv = uv_layers.active
-                if len(uv_layers) > 1:
-                    if active_uv != uv_layers[0]:
-                        uv_layers.active_index = 0
-                        uv_layers.remove(active_uv)
-                    active_uv = uv_layers[0]
-                while len(uv_layers) > 1:
-                    uv_layers.remove(uv_layers[1])
-                if uv_layers:
-                    uv_layers[0].name = "UVMap"
+        meshes = RemoveUnusedData.selected_uv_meshes(bpy.context)
+        removed = 0
+        for mesh, referenced in RemoveUnusedData.collect_uv_references(meshes).items():
+            removed += RemoveUnusedData.clean_uv_layers(mesh, referenced)
         print("UV map cleanup and renaming completed.")
+        return removed
+
+    @staticmethod
+    def linked_slots(users):
+        # Only objects with an object-linked slot can show something other than the mesh materials
+        return [(obj, [(slot.link, slot.material) for slot in obj.material_slots]) for obj in users
+                if any(slot.link == 'OBJECT' for slot in obj.material_slots)]
+
+    @staticmethod
+    def slot_keys(mesh, users, remap=None):
+        remap = remap or {}
+        materials = [remap.get(mat, mat) for mat in mesh.materials]
+        linked = RemoveUnusedData.linked_slots(users)
+        if not linked:
+            return materials
+        # Two slots are only duplicates when every object using the mesh shows the same material in both
+        keys = []
+        for i, mat in enumerate(materials):
+            key = [mat]
+            for obj, slots in linked:
+                material = slots[i][1] if i < len(slots) else None
+                key.append(remap.get(material, material))
+            keys.append(tuple(key))
+        return keys
+
+    @staticmethod
+    def clean_object_slots(obj, candidates, users=None):
+        Profiler.count("objects")
+        Profiler.count("faces", len(obj.data.polygons))
+        users = users or [obj]
+        candidates.update(slot.material for user in users for slot in user.material_slots if slot.material)
+        RemoveUnusedData.merge_duplicate_materials(obj, users)
+        removed = RemoveUnusedData.remove_unused_slots(obj, users)
+        dirty_meshes.discard(obj.data.as_pointer())
+        Profiler.count("slots removed", removed)
+        return removed
 
     @staticmethod
     def remove_unused_material_slots():
-        selected_objects = bpy.context.selected_objects
-        for obj in selected_objects:
-            if obj.type == 'MESH':
-                RemoveUnusedData.merge_duplicate_materials(obj)
-                RemoveUnusedData.remove_unused_slots(obj)
-            else:
-                print(f"Skipped non-mesh object: {obj.name}")
+        removed = 0
+        candidates = set()
+        for obj, users in MaterialUsageIndex.dirty_selection():
+            removed += RemoveUnusedData.clean_object_slots(obj, candidates, users)
+        orphans = RemoveUnusedData.remove_orphan_materials(candidates)
         print("Finished processing all selected objects.")
+        return removed, orphans
+
+    @staticmethod
+    @Profiler.timed("orphan sweep")
+    def find_orphan_materials(candidates=None):
+        if candidates is None:
+            candidates = bpy.data.materials
+        # A slot in an indexed mesh is enough to keep a material, only the rest need a user map
+        candidates = [mat for mat in candidates if mat.library is None and not mat.use_fake_user
+                      and not (mat.users and MaterialUsageIndex.is_used(mat))]
+        if not candidates:
+            return []
+        user_map = bpy.data.user_map(subset=candidates)
+        return [mat for mat in candidates if not user_map.get(mat)]
 
     @staticmethod
-    def merge_duplicate_materials(obj):
+    @Profiler.timed("orphan sweep")
+    def remove_orphan_materials(candidates=None):
+        orphans = RemoveUnusedData.find_orphan_materials(candidates)
+        if not orphans:
+            return 0
+        for mat in orphans:
+            material_fingerprints.pop(mat.as_pointer(), None)
+        bpy.data.batch_remove(orphans)
+        Profiler.count("materials removed", len(orphans))
+        return len(orphans)
+
+    @staticmethod
+    def merge_duplicate_materials(obj, users=None):
         if obj.type != 'MESH':
-            return
-        unique_materials = {}
-        material_mapping = {}
-        for slot in obj.material_slots:
-            if slot.material:
-                if slot.material.name not in unique_materials:
-                    unique_materials[slot.material.name] = slot.material
-                material_mapping[slot.material] = unique_materials[slot.material.name]
-        for i, slot in enumerate(obj.material_slots):
-            if slot.material:
-                obj.material_slots[i].material = material_mapping[slot.material]
-        used_materials = set(material_mapping.values())
-        for i in range(len(obj.material_slots) - 1, -1, -1):
-            if obj.material_slots[i].material not in used_materials:
-                obj.data.materials.pop(index=i)
-        for mat in bpy.data.materials:
-            if mat not in used_materials and mat.users == 0:
-                bpy.data.materials.remove(mat)
+            return 0
+        mesh = obj.data
+        users = users or [obj]
+        keys = RemoveUnusedData.slot_keys(mesh, users)
+        merged = 0
+        if len(keys) > 1:
+            # Every slot points at the first slot holding the same material
+            first_slot = {}
+            slot_remap = np.array([first_slot.setdefault(key, i) for i, key in enumerate(keys)], dtype=np.int32)
+            keep = slot_remap == np.arange(len(keys), dtype=np.int32)
+            counts = MaterialUsageIndex.lookup(mesh)
+            # Duplicates without faces need no face remap, remove_unused_slots drops them as empty slots
+            if counts is not None and not counts[~keep].any():
+                return 0
+            if not keep.all():
+                indices = RemoveUnusedData.read_material_indices(mesh)
+                np.clip(indices, 0, len(keys) - 1, out=indices)
+                merged = RemoveUnusedData.compact_slots(mesh, slot_remap[indices], keep, users)
+        return merged
 
     @staticmethod
-    def remove_unused_slots(obj):
+    @Profiler.timed("scan")
+    def read_material_indices(mesh):
+        indices = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", indices)
+        return indices
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def write_material_indices(mesh, indices):
+        mesh.polygons.foreach_set("material_index", indices)
+        mesh.update()
+        # The signature cannot see new face indices, and the depsgraph handler may not run before the next read
+        MaterialUsageIndex.discard(mesh.as_pointer())
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def compact_slots(mesh, indices, keep, users=()):
+        removed = int(len(keep) - np.count_nonzero(keep))
+        if not removed:
+            return 0
+        lut = np.cumsum(keep, dtype=np.int32) - 1
+        indices = lut[indices]
+        RemoveUnusedData.write_material_indices(mesh, indices)
+        linked = RemoveUnusedData.linked_slots(users)
+        kept = np.flatnonzero(keep).tolist()
+        materials = mesh.materials
+        for new_index, old_index in enumerate(kept):
+            if new_index != old_index:
+                materials[new_index] = materials[old_index]
+        # Faces now only reference the kept range, so popping from the end leaves them untouched
+        for i in range(len(materials) - 1, len(materials) - 1 - removed, -1):
+            materials.pop(index=i)
+        # Object-linked slots live on each object and have to follow the mesh slots they belong to
+        for obj, slots in linked:
+            object_slots = obj.material_slots
+            for new_index, old_index in enumerate(kept):
+                if old_index < len(slots) and new_index < len(object_slots):
+                    link, material = slots[old_index]
+                    object_slots[new_index].link = link
+                    if link == 'OBJECT':
+                        object_slots[new_index].material = material
+        MaterialUsageIndex.store(mesh, indices)
+        return removed
+
+    @staticmethod
+    def remove_unused_slots(obj, users=None):
         if obj.type != 'MESH':
-            return
-        used_indices = set(poly.material_index for poly in obj.data.polygons)
-        for i in range(len(obj.material_slots) - 1, -1, -1):
-            if i not in used_indices:
-                obj.data.materials.pop(index=i)
+            return 0
+        mesh = obj.data
+        slot_count = len(mesh.materials)
+        if not slot_count:
+            return 0
+        counts = MaterialUsageIndex.lookup(mesh)
+        if counts is not None and counts.all():
+            return 0
+        indices = RemoveUnusedData.read_material_indices(mesh)
+        # Faces past the last slot render with it, so count them as using it
+        np.clip(indices, 0, slot_count - 1, out=indices)
+        counts = MaterialUsageIndex.store(mesh, indices)
+        return RemoveUnusedData.compact_slots(mesh, indices, counts > 0, users or [obj])
+
+class GarbageCollector:
+    @staticmethod
+    @Profiler.timed("scan")
+    def reference_graph():
+        # user_map gives each ID the IDs using it, reachability needs the IDs each one uses
+        user_map = bpy.data.user_map()
+        graph = {}
+        for id_data, users in user_map.items():
+            for user in users:
+                graph.setdefault(user, set()).add(id_data)
+        Profiler.count("ids", len(user_map))
+        return user_map, graph
+
+    @staticmethod
+    @Profiler.timed("plan")
+    def reachable(ids, graph, keep_fake_user):
+        roots = [id_data for attr in GC_ROOT_COLLECTIONS for id_data in getattr(bpy.data, attr)]
+        if keep_fake_user:
+            roots.extend(id_data for id_data in ids if id_data.use_fake_user)
+        seen = set(roots)
+        pending = list(roots)
+        while pending:
+            for child in graph.get(pending.pop(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    pending.append(child)
+        return seen
+
+    @staticmethod
+    def id_bytes(id_data):
+        if isinstance(id_data, bpy.types.Image):
+            if id_data.has_data:
+                width, height = id_data.size
+                return width * height * id_data.channels * (4 if id_data.is_float else 1)
+            return id_data.packed_file.size if id_data.packed_file else 0
+        if isinstance(id_data, bpy.types.Mesh):
+            return len(id_data.vertices) * 32 + len(id_data.edges) * 8 + len(id_data.loops) * 16 + len(id_data.polygons) * 16
+        return 0
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def remove_disconnected_nodes(material):
+        tree = material.node_tree
+        outputs = [node for node in tree.nodes if node.type in GC_KEEP_NODES and node.type != 'FRAME']
+        if not outputs:
+            return 0
+        # The active image node is the bake target even when nothing reads it
+        keep = set(outputs)
+        if tree.nodes.active:
+            keep.add(tree.nodes.active)
+        pending = list(keep)
+        while pending:
+            for socket in pending.pop().inputs:
+                for link in socket.links:
+                    if link.from_node not in keep:
+                        keep.add(link.from_node)
+                        pending.append(link.from_node)
+        dead = [node for node in tree.nodes if node not in keep and node.type not in GC_KEEP_NODES]
+        for node in dead:
+            tree.nodes.remove(node)
+        return len(dead)
+
+    @staticmethod
+    def collect_garbage(context):
+        material_tools = context.scene.material_tools
+        removed, reclaimed = GarbageCollector.sweep(material_tools)
+        nodes = 0
+        if material_tools.gc_clean_nodes:
+            # Only materials that survived the sweep, then once more for what the dead nodes were holding
+            for material in bpy.data.materials:
+                if material.library is None and material.use_nodes and material.node_tree:
+                    nodes += GarbageCollector.remove_disconnected_nodes(material)
+            if nodes:
+                more, more_bytes = GarbageCollector.sweep(material_tools)
+                removed += more
+                reclaimed += more_bytes
+        Profiler.count("nodes removed", nodes)
+        Profiler.count("ids removed", removed)
+        print("Garbage collection completed.")
+        return {"removed": removed, "bytes": reclaimed, "nodes": nodes}
+
+    @staticmethod
+    def sweep(material_tools):
+        user_map, graph = GarbageCollector.reference_graph()
+        reachable = GarbageCollector.reachable(user_map, graph, material_tools.gc_keep_fake_user)
+        garbage = [id_data for attr in material_tools.gc_types for id_data in getattr(bpy.data, attr)
+                   if id_data.library is None and id_data not in reachable
+                   and getattr(id_data, "type", None) not in ('RENDER_RESULT', 'COMPOSITING')]
+        reclaimed = sum(GarbageCollector.id_bytes(id_data) for id_data in garbage)
+        for id_data in garbage:
+            if isinstance(id_data, bpy.types.Mesh):
+                MaterialUsageIndex.remove_mesh(id_data.as_pointer())
+            elif isinstance(id_data, bpy.types.Material):
+                material_fingerprints.pop(id_data.as_pointer(), None)
+        bpy.data.batch_remove(garbage)
+        return len(garbage), reclaimed
+
+class AssignmentManifest:
+    @staticmethod
+    def topology(mesh):
+        sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", sizes)
+        return f"{len(mesh.vertices)}:{len(mesh.edges)}:{len(mesh.loops)}:{zlib.crc32(sizes.tobytes()):08x}"
+
+    @staticmethod
+    def index_dtype(slot_count):
+        return "u1" if slot_count <= 1 << 8 else "u2" if slot_count <= 1 << 16 else "i4"
+
+    @staticmethod
+    def paths(path):
+        path = bpy.path.abspath(path)
+        return path, os.path.splitext(path)[0] + ".bin"
+
+    @staticmethod
+    def export_assignments(path):
+        index_path, binary_path = AssignmentManifest.paths(path)
+        meshes = {}
+        objects = {}
+        offset = 0
+        with open(binary_path + ".tmp", "wb") as binary:
+            for obj in bpy.data.objects:
+                # Linked meshes can share a name with local ones and are never restored
+                if obj.type != 'MESH' or obj.data.library is not None:
+                    continue
+                mesh = obj.data
+                if mesh.name not in meshes:
+                    dtype = AssignmentManifest.index_dtype(len(mesh.materials))
+                    indices = RemoveUnusedData.read_material_indices(mesh)
+                    np.clip(indices, 0, max(0, len(mesh.materials) - 1), out=indices)
+                    data = indices.astype(dtype).tobytes()
+                    binary.write(data)
+                    meshes[mesh.name] = {
+                        "topology": AssignmentManifest.topology(mesh),
+                        "faces": len(indices),
+                        "dtype": dtype,
+                        "offset": offset,
+                        "materials": [mat.name if mat else None for mat in mesh.materials],
+                    }
+                    offset += len(data)
+                objects[obj.name] = {
+                    "mesh": mesh.name,
+                    "slots": [[slot.link, slot.material.name if slot.link == 'OBJECT' and slot.material else None]
+                              for slot in obj.material_slots],
+                }
+        os.replace(binary_path + ".tmp", binary_path)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "binary": os.path.basename(binary_path), "meshes": meshes, "objects": objects}, f)
+        os.replace(index_path + ".tmp", index_path)
+        Profiler.count("objects", len(objects))
+        Profiler.count("meshes", len(meshes))
+        Profiler.count("bytes written", offset)
+        return {"objects": len(objects), "meshes": len(meshes), "bytes": offset}
+
+    @staticmethod
+    def import_assignments(context, path, selected_only):
+        index_path, _ = AssignmentManifest.paths(path)
+        with open(index_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != 1:
+            raise ValueError(f"Unsupported assignment manifest version: {manifest.get('version')}")
+        binary_path = os.path.join(os.path.dirname(index_path), manifest["binary"])
+        # Pages are only read for the meshes that are restored
+        data = np.memmap(binary_path, dtype=np.uint8, mode='r') if os.path.getsize(binary_path) else None
+        objects = context.selected_objects if selected_only else bpy.data.objects
+        materials = bpy.data.materials
+        done = set()
+        restored = mismatched = missing = 0
+        for obj in objects:
+            entry = manifest["objects"].get(obj.name)
+            if entry is None or obj.type != 'MESH' or obj.data.library is not None:
+                continue
+            mesh = obj.data
+            mesh_entry = manifest["meshes"][entry["mesh"]]
+            if mesh not in done:
+                done.add(mesh)
+                mesh.materials.clear()
+                for name in mesh_entry["materials"]:
+                    mat = materials.get(name) if name else None
+                    missing += bool(name) and mat is None
+                    mesh.materials.append(mat)
+                if mesh_entry["faces"] and AssignmentManifest.topology(mesh) == mesh_entry["topology"]:
+                    dtype = np.dtype(mesh_entry["dtype"])
+                    start = mesh_entry["offset"]
+                    raw = data[start:start + mesh_entry["faces"] * dtype.itemsize].view(dtype)
+                    RemoveUnusedData.write_material_indices(mesh, raw.astype(np.int32))
+                elif mesh_entry["faces"]:
+                    mismatched += 1
+            for slot, (link, name) in zip(obj.material_slots, entry["slots"]):
+                slot.link = link
+                if link == 'OBJECT':
+                    mat = materials.get(name) if name else None
+                    missing += bool(name) and mat is None
+                    slot.material = mat
+            restored += 1
+        Profiler.count("objects", restored)
+        Profiler.count("meshes", len(done))
+        return {"objects": restored, "meshes": len(done), "mismatched": mismatched, "missing": missing}
+
+class CleanupPlanner:
+    # Bumped by the depsgraph handler, a plan is only applied at the revision it was made at
+    revision = 0
+    plan = None
+
+    @staticmethod
+    def scope(context):
+        return hash(frozenset(obj.name for obj in context.selected_objects))
+
+    @staticmethod
+    def is_current(context=None):
+        plan = CleanupPlanner.plan
+        if not plan or plan["revision"] != CleanupPlanner.revision:
+            return False
+        return context is None or plan["scope"] == CleanupPlanner.scope(context)
+
+    @staticmethod
+    @Profiler.timed("plan")
+    def plan_slots(mesh, remap, users=()):
+        keys = RemoveUnusedData.slot_keys(mesh, users, remap)
+        if not keys:
+            return None
+        materials = [remap.get(mat, mat) for mat in mesh.materials]
+        first_slot = {}
+        slot_remap = np.array([first_slot.setdefault(key, i) for i, key in enumerate(keys)], dtype=np.int32)
+        merged = slot_remap != np.arange(len(materials), dtype=np.int32)
+        counts = MaterialUsageIndex.lookup(mesh)
+        if counts is not None and counts.all() and not merged.any():
+            return None
+        indices = RemoveUnusedData.read_material_indices(mesh)
+        np.clip(indices, 0, len(materials) - 1, out=indices)
+        MaterialUsageIndex.store(mesh, indices)
+        indices = slot_remap[indices]
+        keep = np.zeros(len(materials), dtype=bool)
+        keep[np.unique(indices)] = True
+        if keep.all():
+            return None
+        return {
+            "faces": len(indices),
+            "slots": len(materials),
+            "indices": indices,
+            "keep": keep,
+            "dropped": [mat.name for mat, kept in zip(materials, keep.tolist()) if mat and not kept],
+        }
+
+    @staticmethod
+    def build(context):
+        remap = RemoveUnusedData.find_duplicate_materials()
+        meshes = {obj.data for obj in context.selected_objects if obj.type == 'MESH' and obj.data.library is None}
+        Profiler.count("meshes", len(meshes))
+        MaterialUsageIndex.ensure()
+        # Clean meshes only need a plan when one of their materials is about to be merged away
+        affected = set(dirty_meshes)
+        for mat in remap:
+            key = mat.as_pointer()
+            affected.update(material_users.get(key, ()))
+            affected.update(object_links[name][0] for name in material_objects.get(key, ()) if name in object_links)
+        slots = {}
+        for mesh in meshes:
+            if mesh.as_pointer() not in affected:
+                continue
+            entry = CleanupPlanner.plan_slots(mesh, remap, MaterialUsageIndex.users(mesh))
+            if entry:
+                slots[mesh.name] = entry
+        uv_meshes = {mesh for mesh in meshes if mesh.uv_layers}
+        uv = {}
+        for mesh, referenced in RemoveUnusedData.collect_uv_references(uv_meshes, remap).items():
+            names = RemoveUnusedData.unused_uv_layers(mesh, referenced)
+            if names:
+                uv[mesh.name] = (names, referenced)
+        orphans = [mat.name for mat in RemoveUnusedData.find_orphan_materials() if mat not in remap]
+        CleanupPlanner.plan = {
+            "revision": CleanupPlanner.revision,
+            "scope": CleanupPlanner.scope(context),
+            "duplicates": {mat.name: survivor.name for mat, survivor in remap.items()},
+            "slots": slots,
+            "uv": uv,
+            "orphans": orphans,
+            # Slots dropped by the plan may leave these without users, checked again when applying
+            "candidates": sorted({name for entry in slots.values() for name in entry["dropped"]}),
+        }
+        return CleanupPlanner.plan
+
+    @staticmethod
+    def summary(plan):
+        return [
+            f"Duplicate materials: {len(plan['duplicates'])}",
+            f"Dead slots: {sum(int((~e['keep']).sum()) for e in plan['slots'].values())} in {len(plan['slots'])} meshes",
+            f"Unused UV maps: {sum(len(names) for names, _ in plan['uv'].values())} in {len(plan['uv'])} meshes",
+            f"Orphan materials: {len(plan['orphans'])} (+{len(plan['candidates'])} to check)",
+        ]
+
+    @staticmethod
+    def apply(plan):
+        materials = bpy.data.materials
+        remap = {materials[name]: materials[survivor] for name, survivor in plan["duplicates"].items()
+                 if name in materials and survivor in materials}
+        duplicates = RemoveUnusedData.remap_materials(remap)
+        slots = 0
+        for name, entry in plan["slots"].items():
+            mesh = bpy.data.meshes.get(name)
+            if mesh and len(mesh.polygons) == entry["faces"] and len(mesh.materials) == entry["slots"]:
+                slots += RemoveUnusedData.compact_slots(mesh, entry["indices"], entry["keep"], MaterialUsageIndex.users(mesh))
+                dirty_meshes.discard(mesh.as_pointer())
+        Profiler.count("slots removed", slots)
+        uv = 0
+        for name, (names, referenced) in plan["uv"].items():
+            mesh = bpy.data.meshes.get(name)
+            if mesh:
+                uv += RemoveUnusedData.remove_uv_layers(mesh, [n for n in names if n in mesh.uv_layers], referenced)
+        Profiler.count("uv maps removed", uv)
+        names = set(plan["orphans"]) | set(plan["candidates"])
+        orphans = RemoveUnusedData.remove_orphan_materials([materials[name] for name in names if name in materials])
+        CleanupPlanner.plan = None
+        return duplicates, slots, uv, orphans
 
 class RandomMaterial:
+    @staticmethod
+    @Profiler.timed("scan")
+    def candidate_materials(prefix):
+        materials = bpy.data.materials
+        return [materials[name] for name in materials.keys() if name.startswith(prefix)]
+
+    @staticmethod
+    def probabilities(materials):
+        weights = np.array([mat.random_weight for mat in materials], dtype=np.float64)
+        total = weights.sum()
+        if total <= 0:
+            return None
+        return weights / total
+
+    @staticmethod
+    def generator(seed, name=None):
+        if seed is None:
+            return np.random.default_rng()
+        # Seeding per mesh keeps each result independent of what else is selected
+        return np.random.default_rng([seed, zlib.crc32(name.encode())] if name else seed)
+
     @staticmethod
     def assign_random_material(context):
-        prefix = context.scene.material_tools.random_material_prefix
-        materials = [mat for mat in bpy.data.materials if mat.name.startswith(prefix)]
+        material_tools = context.scene.material_tools
+        materials = RandomMaterial.candidate_materials(material_tools.random_material_prefix)
         if not materials:
-            return {'FINISHED'}
-        for obj in context.selected_objects:
-            obj.active_material = random.choice(materials)
+            return 0
+        probabilities = RandomMaterial.probabilities(materials)
+        seed = material_tools.random_seed if material_tools.random_use_seed else None
+        # Sort so a seed reproduces the same result whatever order the selection comes in
+        objects = sorted((obj for obj in context.selected_objects if hasattr(obj.data, "materials")), key=lambda o: o.name)
+        Profiler.count("objects", len(objects))
+        Profiler.count("materials", len(materials))
+        if material_tools.random_material_mode == 'FACE':
+            return RandomMaterial.assign_per_face(objects, materials, probabilities, seed)
+        picks = RandomMaterial.generator(seed).choice(len(materials), size=len(objects), p=probabilities)
+        for obj, pick in zip(objects, picks.tolist()):
+            obj.active_material = materials[pick]
+        return len(objects)
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def assign_per_face(objects, materials, probabilities, seed):
+        meshes = {}
+        for obj in objects:
+            if obj.type == 'MESH' and obj.data.library is None:
+                meshes.setdefault(obj.data)
+        faces = 0
+        for mesh in meshes:
+            slots = {}
+            for i, mat in enumerate(mesh.materials):
+                slots.setdefault(mat, i)
+            for mat in materials:
+                if mat not in slots:
+                    mesh.materials.append(mat)
+                    slots[mat] = len(mesh.materials) - 1
+            lut = np.array([slots[mat] for mat in materials], dtype=np.int32)
+            picks = RandomMaterial.generator(seed, mesh.name).choice(len(materials), size=len(mesh.polygons), p=probabilities)
+            RemoveUnusedData.write_material_indices(mesh, lut[picks])
+            faces += len(picks)
+        Profiler.count("meshes", len(meshes))
+        Profiler.count("faces", faces)
+        return faces
 
 class AutoLinkTexture:
     @staticmethod
-    def link_textures_to_principled(material):
+    @Profiler.timed("plan")
+    def compile_rules(material_tools):
+        patterns = {}
+        for channel in AUTO_LINK_CHANNELS:
+            suffix = getattr(material_tools, f"{channel}_suffix").lower()
+            patterns[channel] = [re.escape(suffix) + "$"] if suffix else []
+        if material_tools.auto_link_preset_path:
+            with open(bpy.path.abspath(material_tools.auto_link_preset_path), encoding="utf-8") as preset:
+                for channel, entries in json.load(preset).items():
+                    if channel not in patterns:
+                        raise ValueError(f"Unknown texture channel in preset: {channel}")
+                    if isinstance(entries, str):
+                        entries = [entries]
+                    # "re:" entries are regular expressions, anything else is a suffix
+                    patterns[channel] = [e[3:] if e.startswith("re:") else re.escape(e.lower()) + "$" for e in entries]
+        return [(channel, [re.compile(p, re.IGNORECASE) for p in patterns[channel]])
+                for channel in AUTO_LINK_CHANNELS if patterns[channel]]
+
+    @staticmethod
+    def image_channel(image, rules, cache):
+        if image.name not in cache:
+            stem = os.path.splitext(image.name)[0]
+            cache[image.name] = next((channel for channel, regexes in rules if any(r.search(stem) for r in regexes)), None)
+        return cache[image.name]
+
+    @staticmethod
+    def principled_input(principled, *names):
+        return next((principled.inputs[name] for name in names if name in principled.inputs), None)
+
+    @staticmethod
+    def upstream_node(socket, bl_idname, label=None):
+        return next((link.from_node for link in socket.links
+                     if link.from_node.bl_idname == bl_idname and (label is None or link.from_node.label == label)), None)
+
+    @staticmethod
+    def reuse_node(tree, bl_idname, anchor, from_socket=None, to_socket=None):
+        if from_socket is not None:
+            node = next((link.to_node for link in from_socket.links if link.to_node.bl_idname == bl_idname), None)
+            if node:
+                return node
+        if to_socket is not None:
+            node = AutoLinkTexture.upstream_node(to_socket, bl_idname)
+            if node:
+                return node
+        node = tree.nodes.new(bl_idname)
+        node.location = (anchor.location.x + 300, anchor.location.y)
+        return node
+
+    @staticmethod
+    def ensure_link(tree, from_socket, to_socket):
+        if to_socket is None or any(link.from_socket == from_socket for link in to_socket.links):
+            return 0
+        tree.links.new(from_socket, to_socket)
+        return 1
+
+    @staticmethod
+    def multiply_sockets(node):
+        if node.bl_idname == 'ShaderNodeMix':
+            inputs = {socket.identifier: socket for socket in node.inputs}
+            output = next(socket for socket in node.outputs if socket.identifier == 'Result_Color')
+            return inputs['A_Color'], inputs['B_Color'], output
+        return node.inputs['Color1'], node.inputs['Color2'], node.outputs['Color']
+
+    @staticmethod
+    def base_color_target(principled):
+        base_input = AutoLinkTexture.principled_input(principled, 'Base Color')
+        mix = AutoLinkTexture.upstream_node(base_input, MIX_COLOR_NODE, AO_MIX_LABEL)
+        return AutoLinkTexture.multiply_sockets(mix)[0] if mix else base_input
+
+    @staticmethod
+    def link_ambient_occlusion(tree, principled, anchor, source):
+        base_input = AutoLinkTexture.principled_input(principled, 'Base Color')
+        mix = AutoLinkTexture.upstream_node(base_input, MIX_COLOR_NODE, AO_MIX_LABEL)
+        if mix is None:
+            mix = tree.nodes.new(MIX_COLOR_NODE)
+            mix.label = AO_MIX_LABEL
+            mix.location = (anchor.location.x + 300, anchor.location.y)
+            if mix.bl_idname == 'ShaderNodeMix':
+                mix.data_type = 'RGBA'
+            mix.blend_type = 'MULTIPLY'
+            mix.inputs[0].default_value = 1.0
+            color_a = AutoLinkTexture.multiply_sockets(mix)[0]
+            if base_input.is_linked:
+                tree.links.new(base_input.links[0].from_socket, color_a)
+            else:
+                color_a.default_value = base_input.default_value
+        _, color_b, result = AutoLinkTexture.multiply_sockets(mix)
+        return AutoLinkTexture.ensure_link(tree, source, color_b) + AutoLinkTexture.ensure_link(tree, result, base_input)
+
+    @staticmethod
+    def link_channel(tree, principled, channel, node, ao=True):
+        ensure_link = AutoLinkTexture.ensure_link
+        inputs = AutoLinkTexture.principled_input
+        color = node.outputs['Color']
+        if channel in NON_COLOR_CHANNELS and node.image.colorspace_settings.name != 'Non-Color':
+            node.image.colorspace_settings.name = 'Non-Color'
+        if channel == 'base_color':
+            return ensure_link(tree, color, AutoLinkTexture.base_color_target(principled))
+        if channel == 'roughness':
+            return ensure_link(tree, color, inputs(principled, 'Roughness'))
+        if channel == 'metalness':
+            return ensure_link(tree, color, inputs(principled, 'Metallic'))
+        if channel == 'emissive':
+            return ensure_link(tree, color, inputs(principled, 'Emission Color', 'Emission'))
+        if channel == 'alpha':
+            return ensure_link(tree, color, inputs(principled, 'Alpha'))
+        if channel == 'ao':
+            return AutoLinkTexture.link_ambient_occlusion(tree, principled, node, color)
+        normal_input = inputs(principled, 'Normal')
+        if channel == 'normal':
+            bump = AutoLinkTexture.upstream_node(normal_input, 'ShaderNodeBump')
+            target = bump.inputs['Normal'] if bump else normal_input
+            normal_map = AutoLinkTexture.reuse_node(tree, 'ShaderNodeNormalMap', node, color, target)
+            return ensure_link(tree, color, normal_map.inputs['Color']) + ensure_link(tree, normal_map.outputs['Normal'], target)
+        if channel == 'height':
+            bump = AutoLinkTexture.reuse_node(tree, 'ShaderNodeBump', node, color, normal_input)
+            linked = ensure_link(tree, color, bump.inputs['Height'])
+            normal_map = AutoLinkTexture.upstream_node(normal_input, 'ShaderNodeNormalMap')
+            if normal_map:
+                linked += ensure_link(tree, normal_map.outputs['Normal'], bump.inputs['Normal'])
+            return linked + ensure_link(tree, bump.outputs['Normal'], normal_input)
+        if channel == 'orm':
+            # Packed occlusion / roughness / metalness in R / G / B
+            separate = AutoLinkTexture.reuse_node(tree, SEPARATE_COLOR_NODE, node, color)
+            linked = (ensure_link(tree, color, separate.inputs[0])
+                      + ensure_link(tree, separate.outputs[1], inputs(principled, 'Roughness'))
+                      + ensure_link(tree, separate.outputs[2], inputs(principled, 'Metallic')))
+            if ao:
+                linked += AutoLinkTexture.link_ambient_occlusion(tree, principled, separate, separate.outputs[0])
+            return linked
+        return 0
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def link_textures_to_principled(material, rules=None, cache=None):
+        if rules is None:
+            rules = AutoLinkTexture.compile_rules(bpy.context.scene.material_tools)
+        if cache is None:
+            cache = {}
         if not material.use_nodes:
             material.use_nodes = True
-        nodes = material.node_tree.nodes
-        principled = next((n for n in nodes if n.type == 'BSDF_PRINCIPLED'), None)
+        tree = material.node_tree
+        principled = next((n for n in tree.nodes if n.type == 'BSDF_PRINCIPLED'), None)
         if not principled:
-            return
-        material_tools = bpy.context.scene.material_tools
-        for node in nodes:
-            if node.type == 'TEX_IMAGE':
-                image = node.image
-                if not image:
-                    continue
-                name = os.path.splitext(image.name)[0].lower()
-                if name.endswith(material_tools.base_color_suffix.lower()):
-                    material.node_tree.links.new(node.outputs['Color'], principled.inputs['Base Color'])
-                elif name.endswith(material_tools.roughness_suffix):
-                    node.image.colorspace_settings.name = 'Non-Color'
-                    material.node_tree.links.new(node.outputs['Color'], principled.inputs['Roughness'])
-                elif name.endswith(material_tools.metalness_suffix):
-                    node.image.colorspace_settings.name = 'Non-Color'
-                    material.node_tree.links.new(node.outputs['Color'], principled.inputs['Metallic'])
-                elif name.endswith(material_tools.normal_suffix):
-                    node.image.colorspace_settings.name = 'Non-Color'
-                    normal_map = nodes.new(type='ShaderNodeNormalMap')
-                    material.node_tree.links.new(node.outputs['Color'], normal_map.inputs['Color'])
-                    material.node_tree.links.new(normal_map.outputs['Normal'], principled.inputs['Normal'])
-                elif name.endswith(material_tools.emissive_suffix):
-                    material.node_tree.links.new(node.outputs['Color'], principled.inputs['Emission'])
-                elif name.endswith(material_tools.alpha_suffix):
-                    material.node_tree.links.new(node.outputs['Color'], principled.inputs['Alpha'])
-
-    @staticmethod
-    def auto_link_textures():
-        obj = bpy.context.active_object
-        for material_slot in obj.material_slots:
-            material = material_slot.material
-            if material:
-                AutoLinkTexture.link_textures_to_principled(material)
+            return 0
+        matches = []
+        for node in tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image:
+                channel = AutoLinkTexture.image_channel(node.image, rules, cache)
+                if channel:
+                    matches.append((AUTO_LINK_CHANNELS.index(channel), node.name, channel))
+        # Fixed channel order keeps repeated runs stable: base color before AO, normal before height
+        linked = 0
+        for _, name, channel in sorted(matches):
+            linked += AutoLinkTexture.link_channel(tree, principled, channel, tree.nodes[name])
+        return linked
+
+    @staticmethod
+    @Profiler.timed("scan")
+    def materials_in_scope(context, scope):
+        if scope == 'FILE':
+            return [mat for mat in bpy.data.materials if mat.library is None and not getattr(mat, "is_grease_pencil", False)]
+        if scope == 'SELECTED':
+            objects = context.selected_objects
+        else:
+            objects = [context.active_object] if context.active_object else []
+        materials = {}
+        for obj in objects:
+            for slot in obj.material_slots:
+                if slot.material and slot.material.library is None:
+                    materials.setdefault(slot.material)
+        return list(materials)
+
+    @staticmethod
+    def auto_link_textures(scope=None):
+        context = bpy.context
+        material_tools = context.scene.material_tools
+        rules = AutoLinkTexture.compile_rules(material_tools)
+        cache = {}
+        materials = AutoLinkTexture.materials_in_scope(context, scope or material_tools.auto_link_scope)
+        linked = 0
+        for material in materials:
+            linked += AutoLinkTexture.link_textures_to_principled(material, rules, cache)
+        Profiler.count("materials", len(materials))
+        Profiler.count("links", linked)
         print("Texture linking completed.")
+        return len(materials), linked
+
+class TextureDirectoryIndex:
+    @staticmethod
+    def sniff(path):
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                header = f.read(16)
+        except OSError:
+            return None
+        fmt = next((fmt for magic, fmt in TEXTURE_MAGIC if header.startswith(magic)), None)
+        if fmt is None and header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            fmt = "WEBP"
+        # TGA has no signature, trust the extension
+        if fmt is None and path.lower().endswith(".tga"):
+            fmt = "TARGA"
+        return (stat.st_size, stat.st_mtime_ns, fmt) if fmt else None
+
+    @staticmethod
+    def scan(root, cached_dirs):
+        dirs = {}
+        pending = [root]
+        unsniffed = []
+        rescanned = 0
+        while pending:
+            path = pending.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            entry = cached_dirs.get(path)
+            # A directory's mtime only changes when entries are added, removed or renamed
+            if entry is None or entry["mtime"] != mtime:
+                rescanned += 1
+                entry = {"mtime": mtime, "subdirs": [], "files": []}
+                found = []
+                try:
+                    with os.scandir(path) as it:
+                        for item in it:
+                            if item.is_dir(follow_symlinks=False):
+                                entry["subdirs"].append(item.name)
+                            elif os.path.splitext(item.name)[1].lower() in TEXTURE_EXTENSIONS:
+                                found.append((entry, item.name, item.path))
+                except OSError as e:
+                    print(f"Skipped unreadable folder: {path} ({e})")
+                    continue
+                unsniffed.extend(found)
+            dirs[path] = entry
+            pending.extend(os.path.join(path, name) for name in entry["subdirs"])
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+            for (entry, name, _), info in zip(unsniffed, pool.map(TextureDirectoryIndex.sniff, [u[2] for u in unsniffed])):
+                if info:
+                    entry["files"].append([name, *info])
+        return dirs, rescanned
+
+    @staticmethod
+    @Profiler.timed("scan")
+    def load(root):
+        root = os.path.normpath(bpy.path.abspath(root))
+        cache_name = "texture_index_%s.json" % hashlib.sha1(root.encode()).hexdigest()[:16]
+        cached = MaterialToolsCache.load_json(cache_name, {})
+        dirs, rescanned = TextureDirectoryIndex.scan(root, cached.get("dirs", {}))
+        if rescanned:
+            MaterialToolsCache.save_json(cache_name, {"root": root, "dirs": dirs})
+        return dirs, rescanned
+
+    @staticmethod
+    @Profiler.timed("plan")
+    def build_index(dirs, rules):
+        # "wood_albedo.png" matched by the base color rule is filed under index["wood"]["base_color"]
+        index = {}
+        for path in sorted(dirs):
+            for name, *_ in dirs[path]["files"]:
+                stem = os.path.splitext(name)[0]
+                for channel, regexes in rules:
+                    match = next((m for m in (r.search(stem) for r in regexes) if m), None)
+                    if match:
+                        index.setdefault(stem[:match.start()].lower(), {}).setdefault(channel, os.path.join(path, name))
+                        break
+        return index
+
+    @staticmethod
+    def build_textures_from_directory(context, root):
+        material_tools = context.scene.material_tools
+        rules = AutoLinkTexture.compile_rules(material_tools)
+        dirs, rescanned = TextureDirectoryIndex.load(root)
+        index = TextureDirectoryIndex.build_index(dirs, rules)
+        images = {os.path.normcase(os.path.normpath(bpy.path.abspath(img.filepath, library=img.library))): img
+                  for img in bpy.data.images if img.source == 'FILE' and img.filepath}
+        loaded = created = 0
+        cache = {}
+        materials = AutoLinkTexture.materials_in_scope(context, material_tools.auto_link_scope)
+        for material in materials:
+            textures = index.get(RemoveUnusedData.base_material_name(material.name).lower())
+            if not textures:
+                continue
+            if not material.use_nodes:
+                material.use_nodes = True
+            nodes = material.node_tree.nodes
+            principled = next((n for n in nodes if n.type == 'BSDF_PRINCIPLED'), None)
+            if not principled:
+                continue
+            present = {node.image for node in nodes if node.type == 'TEX_IMAGE' and node.image}
+            for row, channel in enumerate(channel for channel in AUTO_LINK_CHANNELS if channel in textures):
+                path = textures[channel]
+                key = os.path.normcase(path)
+                image = images.get(key)
+                if image is None:
+                    try:
+                        image = bpy.data.images.load(path)
+                    except RuntimeError:
+                        print(f"Skipped unreadable texture: {path}")
+                        continue
+                    images[key] = image
+                    loaded += 1
+                if image in present:
+                    continue
+                node = nodes.new('ShaderNodeTexImage')
+                node.image = image
+                node.location = (principled.location.x - 600, principled.location.y - 280 * row)
+                present.add(image)
+                created += 1
+            AutoLinkTexture.link_textures_to_principled(material, rules, cache)
+        file_count = sum(len(entry["files"]) for entry in dirs.values())
+        Profiler.count("materials", len(materials))
+        Profiler.count("files", file_count)
+        Profiler.count("nodes created", created)
+        Profiler.count("images loaded", loaded)
+        print("Texture folder import completed.")
+        return {"materials": len(materials), "nodes": created, "images": loaded, "files": file_count, "rescanned": rescanned}
+
+class ImageBuffers:
+    @staticmethod
+    @Profiler.timed("pack")
+    def wait(future):
+        return future.result()
+
+    @staticmethod
+    @Profiler.timed("save")
+    def save(path, pixels, is_float, alpha=False):
+        # Non-Color keeps the values exactly as computed, whatever the target image is read as later
+        height, width = pixels.shape[:2]
+        image = bpy.data.images.new(os.path.basename(path), width, height, alpha=alpha, float_buffer=is_float)
+        try:
+            image.colorspace_settings.name = 'Non-Color'
+            image.pixels.foreach_set(pixels.ravel())
+            image.filepath_raw = path
+            image.file_format = 'OPEN_EXR' if is_float else 'PNG'
+            image.save()
+        finally:
+            bpy.data.images.remove(image)
+
+class OrmPacker:
+    @staticmethod
+    def sources(material, rules, cache):
+        tree = material.node_tree if material.use_nodes else None
+        principled = next((n for n in tree.nodes if n.type == 'BSDF_PRINCIPLED'), None) if tree else None
+        if not principled:
+            return None
+        found = {}
+        for node in tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image:
+                channel = AutoLinkTexture.image_channel(node.image, rules, cache)
+                if channel in ORM_CHANNELS:
+                    found.setdefault(channel, node)
+        if "roughness" not in found or "metalness" not in found:
+            return None
+        # Anything between a source and the BSDF (inverted gloss, ramps) would be lost by relinking
+        for node in found.values():
+            for output in node.outputs:
+                if any(link.to_node != principled and link.to_node.label != AO_MIX_LABEL for link in output.links):
+                    return None
+        # One packed node samples all three, so they must already sample the same way
+        if len({OrmPacker.sampling(node) for node in found.values()}) > 1:
+            return None
+        return principled, found
+
+    @staticmethod
+    def sampling(node):
+        vector = node.inputs['Vector']
+        source = (vector.links[0].from_node.name, vector.links[0].from_socket.identifier) if vector.is_linked else None
+        return source, node.interpolation, node.projection, node.extension
+
+    @staticmethod
+    def output_path(triplet, rules, suffix):
+        image = triplet[1]
+        stem = os.path.splitext(os.path.basename(image.filepath) or image.name)[0]
+        regexes = next((regexes for channel, regexes in rules if channel == "roughness"), [])
+        match = next((m for m in (r.search(stem) for r in regexes) if m), None)
+        if match:
+            stem = stem[:match.start()]
+        folder = os.path.dirname(bpy.path.abspath(image.filepath, library=image.library)) if image.filepath else bpy.path.abspath("//")
+        if not folder:
+            raise ValueError(f"Save the file first, {image.name} has no folder to write next to")
+        # Triplets sharing a roughness map differ in AO or metalness, so the name carries all three sources
+        digest = hashlib.sha1("\n".join(OrmPacker.source_key(i) for i in triplet).encode()).hexdigest()[:8]
+        return os.path.join(folder, f"{stem}_{digest}{suffix or AUTO_LINK_DEFAULT_SUFFIXES['orm']}{'.exr' if image.is_float else '.png'}")
+
+    @staticmethod
+    def source_key(image):
+        if image is None:
+            return ""
+        return os.path.normcase(bpy.path.abspath(image.filepath, library=image.library)) if image.filepath else image.name
+
+    @staticmethod
+    def is_current(path, images):
+        if not os.path.exists(path):
+            return False
+        mtimes = []
+        for image in images:
+            source = bpy.path.abspath(image.filepath, library=image.library) if image.filepath and not image.packed_file else ""
+            if not os.path.exists(source):
+                return False
+            mtimes.append(os.path.getmtime(source))
+        return os.path.getmtime(path) >= max(mtimes)
+
+    @staticmethod
+    @Profiler.timed("read")
+    def read_channel(image):
+        width, height = image.size
+        if not width or not height:
+            raise ValueError(f"No pixels in {image.name}")
+        pixels = np.empty(width * height * image.channels, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        # Grey maps carry the value in every channel, the first one is enough
+        return pixels.reshape(height, width, image.channels)[:, :, 0].copy()
+
+    @staticmethod
+    def resample(channel, height, width):
+        h, w = channel.shape
+        if (h, w) == (height, width):
+            return channel
+        ys = np.clip((np.arange(height, dtype=np.float32) + 0.5) * h / height - 0.5, 0, h - 1)
+        xs = np.clip((np.arange(width, dtype=np.float32) + 0.5) * w / width - 0.5, 0, w - 1)
+        y0, x0 = ys.astype(np.int32), xs.astype(np.int32)
+        y1, x1 = np.minimum(y0 + 1, h - 1), np.minimum(x0 + 1, w - 1)
+        fy, fx = (ys - y0)[:, None], xs - x0
+        top = channel[y0][:, x0] * (1 - fx) + channel[y0][:, x1] * fx
+        bottom = channel[y1][:, x0] * (1 - fx) + channel[y1][:, x1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    @staticmethod
+    def pack(channels):
+        # Runs in a worker thread, NumPy releases the GIL for the heavy parts
+        height = max(c.shape[0] for c in channels if c is not None)
+        width = max(c.shape[1] for c in channels if c is not None)
+        packed = np.ones((height, width, 4), dtype=np.float32)
+        for i, channel in enumerate(channels):
+            if channel is not None:
+                packed[:, :, i] = OrmPacker.resample(channel, height, width)
+        return packed
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def relink(material, principled, found, image):
+        tree = material.node_tree
+        anchor = found["roughness"]
+        node = tree.nodes.new('ShaderNodeTexImage')
+        node.image = image
+        node.location = anchor.location
+        node.interpolation = anchor.interpolation
+        node.projection = anchor.projection
+        node.extension = anchor.extension
+        vector = anchor.inputs['Vector']
+        if vector.is_linked:
+            tree.links.new(vector.links[0].from_socket, node.inputs['Vector'])
+        AutoLinkTexture.link_channel(tree, principled, 'orm', node, ao="ao" in found)
+        for source in found.values():
+            if not any(output.is_linked for output in source.outputs):
+                tree.nodes.remove(source)
+
+    @staticmethod
+    def pack_orm(context):
+        material_tools = context.scene.material_tools
+        rules = AutoLinkTexture.compile_rules(material_tools)
+        cache = {}
+        materials = AutoLinkTexture.materials_in_scope(context, material_tools.auto_link_scope)
+        groups = {}
+        for material in materials:
+            match = OrmPacker.sources(material, rules, cache)
+            if match:
+                key = tuple(match[1][c].image.name if c in match[1] else None for c in ORM_CHANNELS)
+                groups.setdefault(key, []).append((material, *match))
+        Profiler.count("materials", sum(len(group) for group in groups.values()))
+        Profiler.count("triplets", len(groups))
+        images = bpy.data.images
+        sources = {images[name] for key in groups for name in key if name}
+        packed = relinked = 0
+        keys = list(groups)
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            # Batches bound how many full resolution source maps are held at once
+            for start in range(0, len(keys), TEXTURE_BATCH):
+                jobs = {}
+                for key in keys[start:start + TEXTURE_BATCH]:
+                    triplet = [images[name] if name else None for name in key]
+                    path = OrmPacker.output_path(triplet, rules, material_tools.orm_suffix)
+                    if OrmPacker.is_current(path, [image for image in triplet if image]):
+                        jobs[key] = (path, None, False)
+                        continue
+                    try:
+                        channels = [OrmPacker.read_channel(image) if image else None for image in triplet]
+                    except (ValueError, RuntimeError) as e:
+                        print(f"Skipped ORM packing for {key[1]}: {e}")
+                        continue
+                    jobs[key] = (path, pool.submit(OrmPacker.pack, channels), any(image.is_float for image in triplet if image))
+                for key, (path, future, is_float) in jobs.items():
+                    try:
+                        if future:
+                            ImageBuffers.save(path, ImageBuffers.wait(future), is_float)
+                            packed += 1
+                        image = images.load(path, check_existing=True)
+                    except RuntimeError as e:
+                        print(f"Skipped ORM packing for {key[1]}: {e}")
+                        continue
+                    image.colorspace_settings.name = 'Non-Color'
+                    for material, principled, found in groups[key]:
+                        OrmPacker.relink(material, principled, found, image)
+                        relinked += 1
+        # Source maps no node uses any more would otherwise stay in memory until the file is reloaded
+        unused = [image for image in sources if image.users == 0]
+        bpy.data.batch_remove(unused)
+        Profiler.count("images packed", packed)
+        Profiler.count("images removed", len(unused))
+        print("ORM packing completed.")
+        return {"materials": relinked, "packed": packed, "removed": len(unused)}
+
+class TextureProxies:
+    @staticmethod
+    @Profiler.timed("scan")
+    def material_images(materials):
+        images = {}
+        seen = set()
+        pending = [mat.node_tree for mat in materials if mat.use_nodes and mat.node_tree]
+        while pending:
+            tree = pending.pop()
+            if tree in seen:
+                continue
+            seen.add(tree)
+            for node in tree.nodes:
+                if node.type == 'TEX_IMAGE' and node.image:
+                    image = node.image
+                    if image.library is None and image.source == 'FILE' and image.filepath and not image.packed_file:
+                        images.setdefault(image)
+                elif node.type == 'GROUP' and node.node_tree:
+                    pending.append(node.node_tree)
+        return list(images)
+
+    @staticmethod
+    def full_path(image):
+        path = image.get(FULL_PATH_PROPERTY, image.filepath)
+        return os.path.normcase(os.path.realpath(bpy.path.abspath(path, library=image.library)))
+
+    @staticmethod
+    @Profiler.timed("read")
+    def read_pixels(image, path):
+        # An image showing its proxy has to be read from the original file
+        source = bpy.data.images.load(path) if FULL_PATH_PROPERTY in image else image
+        try:
+            width, height = source.size
+            if max(width, height) < PROXY_MIN_SIZE:
+                return None
+            pixels = np.empty(width * height * source.channels, dtype=np.float32)
+            source.pixels.foreach_get(pixels)
+            pixels = pixels.reshape(height, width, source.channels)
+        finally:
+            if source != image:
+                bpy.data.images.remove(source)
+        if pixels.shape[2] < 4:
+            pixels = np.concatenate((pixels, np.ones(pixels.shape[:2] + (4 - pixels.shape[2],), dtype=np.float32)), axis=2)
+        return pixels
+
+    @staticmethod
+    def lanczos_taps(size, factor):
+        out = max(1, size // factor)
+        centers = (np.arange(out) + 0.5) * factor - 0.5
+        offsets = np.arange(-LANCZOS_LOBES * factor + 1, LANCZOS_LOBES * factor + 1)
+        taps = np.floor(centers).astype(np.int64)[:, None] + offsets
+        # The kernel is stretched by the factor so it low-passes before decimating
+        x = (taps - centers[:, None]) / factor
+        weights = np.sinc(x) * np.sinc(x / LANCZOS_LOBES)
+        weights[np.abs(x) >= LANCZOS_LOBES] = 0.0
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.clip(taps, 0, size - 1), weights.astype(np.float32)
+
+    @staticmethod
+    def filter_axis(pixels, taps, weights, axis):
+        moved = np.moveaxis(pixels, axis, 0)
+        result = np.zeros((len(taps),) + moved.shape[1:], dtype=np.float32)
+        shape = (-1,) + (1,) * (moved.ndim - 1)
+        for t in range(taps.shape[1]):
+            result += weights[:, t].reshape(shape) * moved[taps[:, t]]
+        return np.moveaxis(result, 0, axis)
+
+    @staticmethod
+    def downscale(pixels, factor, method, is_float):
+        # Runs in a worker thread
+        height, width = pixels.shape[:2]
+        if method == 'LANCZOS':
+            pixels = TextureProxies.filter_axis(pixels, *TextureProxies.lanczos_taps(height, factor), 0)
+            pixels = TextureProxies.filter_axis(pixels, *TextureProxies.lanczos_taps(width, factor), 1)
+            # Ringing overshoots, which byte images cannot store
+            return pixels if is_float else np.clip(pixels, 0.0, 1.0)
+        out_h, out_w = max(1, height // factor), max(1, width // factor)
+        fy, fx = min(factor, height), min(factor, width)
+        cropped = pixels[:out_h * fy, :out_w * fx]
+        return cropped.reshape(out_h, fy, out_w, fx, pixels.shape[2]).mean(axis=(1, 3), dtype=np.float32)
+
+    @staticmethod
+    def proxy_folder(material_tools):
+        folder = bpy.path.abspath(material_tools.proxy_folder) if material_tools.proxy_folder else MaterialToolsCache.path("proxies")
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @staticmethod
+    def generate_proxies(context):
+        material_tools = context.scene.material_tools
+        factor = int(material_tools.proxy_factor)
+        method = material_tools.proxy_filter
+        folder = TextureProxies.proxy_folder(material_tools)
+        materials = AutoLinkTexture.materials_in_scope(context, material_tools.auto_link_scope)
+        sources = {}
+        stats = {}
+        for image in TextureProxies.material_images(materials):
+            path = TextureProxies.full_path(image)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            sources[image] = path
+            stats[path] = (stat.st_size, stat.st_mtime_ns)
+        # Keyed by content, so copies of a map share a proxy and edited maps get a new one
+        digests = RemoveUnusedData.file_digests(stats)
+        images = list(sources)
+        written = assigned = 0
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            for start in range(0, len(images), TEXTURE_BATCH):
+                jobs = {}
+                for image in images[start:start + TEXTURE_BATCH]:
+                    path = sources[image]
+                    name = f"{digests[path]}_{factor}{'_lanczos' if method == 'LANCZOS' else ''}{'.exr' if image.is_float else '.png'}"
+                    proxy = os.path.join(folder, name)
+                    if os.path.exists(proxy):
+                        jobs[image] = (proxy, None)
+                        continue
+                    try:
+                        pixels = TextureProxies.read_pixels(image, path)
+                    except RuntimeError as e:
+                        print(f"Skipped proxy for {image.name}: {e}")
+                        continue
+                    if pixels is not None:
+                        jobs[image] = (proxy, pool.submit(TextureProxies.downscale, pixels, factor, method, image.is_float))
+                for image, (proxy, future) in jobs.items():
+                    if future:
+                        try:
+                            ImageBuffers.save(proxy, ImageBuffers.wait(future), image.is_float, alpha=True)
+                        except RuntimeError as e:
+                            print(f"Skipped proxy for {image.name}: {e}")
+                            continue
+                        written += 1
+                    image[PROXY_PATH_PROPERTY] = proxy
+                    assigned += 1
+        if material_tools.use_texture_proxies:
+            TextureProxies.swap(True, images)
+        Profiler.count("images", len(images))
+        Profiler.count("proxies written", written)
+        print("Texture proxies generated.")
+        return {"images": assigned, "written": written}
+
+    @staticmethod
+    @Profiler.timed("apply")
+    def swap(use_proxies, images=None):
+        swapped = []
+        for image in bpy.data.images if images is None else images:
+            if image.library is not None or PROXY_PATH_PROPERTY not in image:
+                continue
+            if use_proxies and FULL_PATH_PROPERTY not in image and os.path.exists(image[PROXY_PATH_PROPERTY]):
+                image[FULL_PATH_PROPERTY] = image.filepath
+                image.filepath = image[PROXY_PATH_PROPERTY]
+                swapped.append(image)
+            elif not use_proxies and FULL_PATH_PROPERTY in image:
+                image.filepath = image[FULL_PATH_PROPERTY]
+                del image[FULL_PATH_PROPERTY]
+                swapped.append(image)
+        Profiler.count("images swapped", len(swapped))
+        return swapped
+
+    @staticmethod
+    def before_save():
+        # filepath_raw only changes the stored path, the loaded proxy pixels stay as they are
+        for image in bpy.data.images:
+            if image.library is None and FULL_PATH_PROPERTY in image:
+                proxy_save["images"][image.name] = image.filepath_raw
+                image.filepath_raw = image[FULL_PATH_PROPERTY]
+                del image[FULL_PATH_PROPERTY]
+        proxy_save["scenes"] = [scene.name for scene in bpy.data.scenes if scene.material_tools.use_texture_proxies]
+        for name in proxy_save["scenes"]:
+            bpy.data.scenes[name].material_tools.use_texture_proxies = False
+
+    @staticmethod
+    def after_save():
+        images = bpy.data.images
+        for name, proxy in proxy_save["images"].items():
+            image = images.get(name)
+            if image:
+                image[FULL_PATH_PROPERTY] = image.filepath_raw
+                image.filepath_raw = proxy
+        for name in proxy_save["scenes"]:
+            if name in bpy.data.scenes:
+                bpy.data.scenes[name].material_tools.use_texture_proxies = True
+        proxy_save["images"] = {}
+        proxy_save["scenes"] = []
 
 class MATERIAL_TOOLS_Properties(bpy.types.PropertyGroup):
     random_material_prefix: bpy.props.StringProperty(
@@ -141,6 +2027,26 @@ class MATERIAL_TOOLS_Properties(bpy.types.PropertyGroup):
         description="Prefix for materials to be used in random assignment",
         default="_"
     )
+    random_material_mode: bpy.props.EnumProperty(
+        name="Mode",
+        description="What receives a random material",
+        items=(
+            ('OBJECT', "Per Object", "One material per selected object"),
+            ('FACE', "Per Face", "Scatter the materials across the faces of each selected mesh"),
+        ),
+        default='OBJECT'
+    )
+    random_use_seed: bpy.props.BoolProperty(
+        name="Use Seed",
+        description="Produce the same assignment every time for the same seed",
+        default=False
+    )
+    random_seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Seed for deterministic random assignment",
+        default=0,
+        min=0
+    )
     base_color_suffix: bpy.props.StringProperty(
         name="Base Color Suffix",
         description="Suffix for base color textures",
@@ -171,6 +2077,129 @@ class MATERIAL_TOOLS_Properties(bpy.types.PropertyGroup):
         description="Suffix for alpha textures",
         default="_alpha"
     )
+    ao_suffix: bpy.props.StringProperty(
+        name="AO Suffix",
+        description="Suffix for ambient occlusion textures",
+        default="_ao"
+    )
+    height_suffix: bpy.props.StringProperty(
+        name="Height Suffix",
+        description="Suffix for height textures",
+        default="_height"
+    )
+    orm_suffix: bpy.props.StringProperty(
+        name="ORM Suffix",
+        description="Suffix for packed occlusion/roughness/metalness textures",
+        default="_orm"
+    )
+    auto_link_preset_path: bpy.props.StringProperty(
+        name="Rule Preset",
+        description="JSON file mapping channels to suffixes or 're:' regular expressions, overriding the suffixes above",
+        default="",
+        subtype='FILE_PATH'
+    )
+    texture_root: bpy.props.StringProperty(
+        name="Texture Folder",
+        description="Folder searched for <material name><suffix> textures",
+        default="",
+        subtype='DIR_PATH'
+    )
+    proxy_factor: bpy.props.EnumProperty(
+        name="Proxy Size",
+        description="Resolution of generated texture proxies",
+        items=(
+            ('2', "1/2", "Half resolution"),
+            ('4', "1/4", "Quarter resolution"),
+            ('8', "1/8", "Eighth resolution"),
+        ),
+        default='4'
+    )
+    proxy_filter: bpy.props.EnumProperty(
+        name="Filter",
+        description="Downscaling filter for texture proxies",
+        items=(
+            ('BOX', "Box", "Average each block of pixels, fastest"),
+            ('LANCZOS', "Lanczos", "Sharper result, slower"),
+        ),
+        default='BOX'
+    )
+    proxy_folder: bpy.props.StringProperty(
+        name="Proxy Folder",
+        description="Where proxies are written, empty uses the add-on cache folder",
+        default="",
+        subtype='DIR_PATH'
+    )
+    use_texture_proxies: bpy.props.BoolProperty(
+        name="Use Proxies",
+        description="Images with a proxy currently load it instead of the full resolution file",
+        default=False
+    )
+    gc_types: bpy.props.EnumProperty(
+        name="Collect",
+        description="Datablock types removed when nothing a scene uses leads to them",
+        items=GC_TYPES,
+        default={item[0] for item in GC_TYPES},
+        options={'ENUM_FLAG'}
+    )
+    gc_keep_fake_user: bpy.props.BoolProperty(
+        name="Keep Fake Users",
+        description="Treat datablocks with a fake user, and everything they use, as reachable",
+        default=True
+    )
+    gc_clean_nodes: bpy.props.BoolProperty(
+        name="Disconnected Nodes",
+        description="Also remove shader nodes that do not lead to a material output in every local material, including parked alternates and paint slot images",
+        default=False
+    )
+    manifest_path: bpy.props.StringProperty(
+        name="Manifest",
+        description="JSON index of the assignment snapshot, face indices go to a .bin file next to it",
+        default="//material_assignments.json",
+        subtype='FILE_PATH'
+    )
+    manifest_selected_only: bpy.props.BoolProperty(
+        name="Selected Only",
+        description="Only restore assignments of the selected objects",
+        default=False
+    )
+    run_in_chunks: bpy.props.BoolProperty(
+        name="Run in Chunks",
+        description="Run long cleanups in small steps with a progress bar, Esc cancels",
+        default=False
+    )
+    chunk_budget_ms: bpy.props.IntProperty(
+        name="Budget (ms)",
+        description="Target time per chunk, lower keeps the interface more responsive",
+        default=40,
+        min=5,
+        max=1000
+    )
+    chunk_resume: bpy.props.BoolProperty(
+        name="Resume",
+        description="Continue an interrupted chunked run from its checkpoint",
+        default=True
+    )
+    profile_enabled: bpy.props.BoolProperty(
+        name="Capture cProfile",
+        description="Profile every operator run with cProfile and keep the hottest functions",
+        default=False
+    )
+    profile_log_path: bpy.props.StringProperty(
+        name="Stats Log",
+        description="JSON-lines file every operator run is appended to (defaults to the add-on cache folder)",
+        default="",
+        subtype='FILE_PATH'
+    )
+    auto_link_scope: bpy.props.EnumProperty(
+        name="Scope",
+        description="Which materials to link",
+        items=(
+            ('ACTIVE', "Active Object", "Materials of the active object"),
+            ('SELECTED', "Selected Objects", "Each material of the selected objects once"),
+            ('FILE', "Whole File", "Every local material in the file"),
+        ),
+        default='ACTIVE'
+    )
 
 class MATERIAL_TOOLS_PT_Panel(bpy.types.Panel):
     bl_label = "Simple Material Tool"
@@ -191,8 +2220,33 @@ class MATERIAL_TOOLS_PT_Panel(bpy.types.Panel):
         row.label(text="Remove Unused Data")
         if context.scene.remove_unused_data_expand:
             box.operator("material_tools.delete_duplicate_materials")
-            box.operator("material_tools.delete_unused_uv_map")
-            box.operator("material_tools.remove_unused_material_slots")
+            box.operator("material_tools.deduplicate_materials_by_content")
+            box.operator("material_tools.deduplicate_images")
+            chunked = "_chunked" if material_tools.run_in_chunks else ""
+            box.operator("material_tools.delete_unused_uv_map" + chunked)
+            box.operator("material_tools.remove_unused_material_slots" + chunked)
+            box.operator("material_tools.remove_orphan_materials")
+            col = box.column(align=True)
+            col.row(align=True).prop(material_tools, "gc_types")
+            row = col.row(align=True)
+            row.prop(material_tools, "gc_keep_fake_user")
+            row.prop(material_tools, "gc_clean_nodes")
+            col.operator("material_tools.collect_garbage")
+            box.prop(material_tools, "run_in_chunks")
+            row = box.row(align=True)
+            row.operator("material_tools.plan_cleanup")
+            row.operator("material_tools.apply_cleanup_plan")
+            plan = CleanupPlanner.plan
+            if plan:
+                col = box.column(align=True)
+                if not CleanupPlanner.is_current():
+                    col.label(text="Plan is out of date", icon="ERROR")
+                for line in CleanupPlanner.summary(plan):
+                    col.label(text=line)
+            if material_tools.run_in_chunks:
+                row = box.row()
+                row.prop(material_tools, "chunk_budget_ms")
+                row.prop(material_tools, "chunk_resume")
 
         # Random Material
         box = layout.box()
@@ -201,6 +2255,14 @@ class MATERIAL_TOOLS_PT_Panel(bpy.types.Panel):
         row.label(text="Random Material")
         if context.scene.random_material_expand:
             box.prop(material_tools, "random_material_prefix")
+            box.prop(material_tools, "random_material_mode")
+            row = box.row()
+            row.prop(material_tools, "random_use_seed")
+            sub = row.row()
+            sub.enabled = material_tools.random_use_seed
+            sub.prop(material_tools, "random_seed")
+            if context.object and context.object.active_material:
+                box.prop(context.object.active_material, "random_weight", text=f"Weight: {context.object.active_material.name}")
             box.operator("material_tools.random_material")
 
         # Auto Link Texture
@@ -215,15 +2277,86 @@ class MATERIAL_TOOLS_PT_Panel(bpy.types.Panel):
             box.prop(material_tools, "normal_suffix")
             box.prop(material_tools, "emissive_suffix")
             box.prop(material_tools, "alpha_suffix")
+            box.prop(material_tools, "ao_suffix")
+            box.prop(material_tools, "height_suffix")
+            box.prop(material_tools, "orm_suffix")
+            box.prop(material_tools, "auto_link_preset_path")
+            box.prop(material_tools, "auto_link_scope")
             box.operator("material_tools.reset_auto_link_suffixes")
-            box.operator("material_tools.auto_link_textures")
+            box.operator("material_tools.auto_link_textures" + ("_chunked" if material_tools.run_in_chunks else ""))
+            box.operator("material_tools.pack_orm")
+            row = box.row(align=True)
+            row.prop(material_tools, "proxy_factor", text="")
+            row.prop(material_tools, "proxy_filter", text="")
+            box.prop(material_tools, "proxy_folder")
+            row = box.row(align=True)
+            row.operator("material_tools.generate_texture_proxies")
+            row.operator("material_tools.toggle_texture_proxies", depress=material_tools.use_texture_proxies,
+                         text="Proxies On" if material_tools.use_texture_proxies else "Proxies Off")
+            if material_tools.use_texture_proxies:
+                box.operator("material_tools.render_full_resolution", icon="RENDER_STILL")
+            box.prop(material_tools, "texture_root")
+            box.operator("material_tools.build_textures_from_directory")
+
+        # Assignments
+        box = layout.box()
+        row = box.row()
+        row.prop(context.scene, "assignments_expand", icon="TRIA_DOWN" if context.scene.assignments_expand else "TRIA_RIGHT", icon_only=True, emboss=False)
+        row.label(text="Assignments")
+        if context.scene.assignments_expand:
+            box.prop(material_tools, "manifest_path")
+            box.prop(material_tools, "manifest_selected_only")
+            row = box.row(align=True)
+            row.operator("material_tools.export_assignments")
+            row.operator("material_tools.import_assignments")
+
+        # Stats
+        box = layout.box()
+        row = box.row()
+        row.prop(context.scene, "stats_expand", icon="TRIA_DOWN" if context.scene.stats_expand else "TRIA_RIGHT", icon_only=True, emboss=False)
+        row.label(text="Stats")
+        if context.scene.stats_expand:
+            box.prop(material_tools, "profile_enabled")
+            box.prop(material_tools, "profile_log_path")
+            stats = Profiler.last
+            if stats:
+                box.label(text=f"{stats['operator']}: {stats['seconds']:.3f}s")
+                col = box.column(align=True)
+                for name, seconds in stats["phases"].items():
+                    col.label(text=f"{name}: {seconds:.3f}s")
+                for name, value in stats["counters"].items():
+                    col.label(text=f"{name}: {value}")
+                for function, calls, _, total in stats.get("profile", [])[:8]:
+                    col.label(text=f"{total:.3f}s  {calls}x  {function}")
 
 class MATERIAL_TOOLS_OT_DeleteDuplicateMaterials(bpy.types.Operator):
     bl_idname = "material_tools.delete_duplicate_materials"
     bl_label = "Delete Duplicate Materials"
 
     def execute(self, context):
-        RemoveUnusedData.delete_duplicate_materials()
+        with Profiler.operator(self, context) as stats:
+            count = RemoveUnusedData.delete_duplicate_materials()
+        self.report({'INFO'}, f"Collapsed {count} duplicate materials in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_DeduplicateMaterialsByContent(bpy.types.Operator):
+    bl_idname = "material_tools.deduplicate_materials_by_content"
+    bl_label = "Deduplicate by Content"
+
+    def execute(self, context):
+        with Profiler.operator(self, context) as stats:
+            count = RemoveUnusedData.deduplicate_materials_by_content()
+        self.report({'INFO'}, f"Merged {count} materials with identical node trees in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_DeduplicateImages(bpy.types.Operator):
+    bl_idname = "material_tools.deduplicate_images"
+    bl_label = "Deduplicate Images"
+
+    def execute(self, context):
+        with Profiler.operator(self, context) as stats:
+            count, reclaimed = RemoveUnusedData.deduplicate_images()
+        self.report({'INFO'}, f"Merged {count} duplicate images, reclaimed {reclaimed / (1 << 20):.1f} MB of pixels in {stats['seconds']:.2f}s")
         return {'FINISHED'}
 
 class MATERIAL_TOOLS_OT_DeleteUnusedUVMap(bpy.types.Operator):
@@ -231,7 +2364,9 @@ class MATERIAL_TOOLS_OT_DeleteUnusedUVMap(bpy.types.Operator):
     bl_label = "Delete Unused UV Map"
 
     def execute(self, context):
-        RemoveUnusedData.delete_unused_uv_map()
+        with Profiler.operator(self, context) as stats:
+            removed = RemoveUnusedData.delete_unused_uv_map()
+        self.report({'INFO'}, f"Removed {removed} unused UV maps in {stats['seconds']:.2f}s")
         return {'FINISHED'}
 
 class MATERIAL_TOOLS_OT_RemoveUnusedMaterialSlots(bpy.types.Operator):
@@ -239,7 +2374,60 @@ class MATERIAL_TOOLS_OT_RemoveUnusedMaterialSlots(bpy.types.Operator):
     bl_label = "Remove Unused Material Slots"
 
     def execute(self, context):
-        RemoveUnusedData.remove_unused_material_slots()
+        with Profiler.operator(self, context) as stats:
+            removed, orphans = RemoveUnusedData.remove_unused_material_slots()
+        self.report({'INFO'}, f"Removed {removed} unused material slots and {orphans} orphan materials in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_RemoveOrphanMaterials(bpy.types.Operator):
+    bl_idname = "material_tools.remove_orphan_materials"
+    bl_label = "Remove Orphan Materials"
+
+    def execute(self, context):
+        with Profiler.operator(self, context) as stats:
+            count = RemoveUnusedData.remove_orphan_materials()
+        self.report({'INFO'}, f"Removed {count} orphan materials in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_CollectGarbage(bpy.types.Operator):
+    bl_idname = "material_tools.collect_garbage"
+    bl_label = "Collect Garbage"
+    bl_description = "Remove datablocks of the chosen types that no scene, workspace or window can reach"
+
+    def execute(self, context):
+        with Profiler.operator(self, context) as stats:
+            result = GarbageCollector.collect_garbage(context)
+        self.report({'INFO'}, (f"Removed {result['removed']} unreachable datablocks ({result['bytes'] / (1 << 20):.1f} MB) "
+                               f"and {result['nodes']} disconnected nodes in {stats['seconds']:.2f}s"))
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_PlanCleanup(bpy.types.Operator):
+    bl_idname = "material_tools.plan_cleanup"
+    bl_label = "Plan Cleanup"
+    bl_description = "Scan the selection and list what the cleanups would change without changing anything"
+
+    def execute(self, context):
+        with Profiler.operator(self, context) as stats:
+            plan = CleanupPlanner.build(context)
+        self.report({'INFO'}, f"{', '.join(CleanupPlanner.summary(plan))} in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_ApplyCleanupPlan(bpy.types.Operator):
+    bl_idname = "material_tools.apply_cleanup_plan"
+    bl_label = "Apply Plan"
+    bl_description = "Apply the last cleanup plan without scanning again"
+
+    @classmethod
+    def poll(cls, context):
+        return CleanupPlanner.plan is not None
+
+    def execute(self, context):
+        if not CleanupPlanner.is_current(context):
+            self.report({'ERROR'}, "The scene or selection changed since the plan was made, plan again")
+            return {'CANCELLED'}
+        with Profiler.operator(self, context) as stats:
+            duplicates, slots, uv, orphans = CleanupPlanner.apply(CleanupPlanner.plan)
+        self.report({'INFO'}, f"Collapsed {duplicates} duplicates, removed {slots} slots, {uv} UV maps and {orphans} orphans in {stats['seconds']:.2f}s")
         return {'FINISHED'}
 
 class MATERIAL_TOOLS_OT_RandomMaterial(bpy.types.Operator):
@@ -247,7 +2435,10 @@ class MATERIAL_TOOLS_OT_RandomMaterial(bpy.types.Operator):
     bl_label = "Random Material"
 
     def execute(self, context):
-        RandomMaterial.assign_random_material(context)
+        with Profiler.operator(self, context) as stats:
+            count = RandomMaterial.assign_random_material(context)
+        target = "faces" if context.scene.material_tools.random_material_mode == 'FACE' else "objects"
+        self.report({'INFO'}, f"Assigned random materials to {count} {target} in {stats['seconds']:.2f}s")
         return {'FINISHED'}
 
 class MATERIAL_TOOLS_OT_AutoLinkTextures(bpy.types.Operator):
@@ -255,21 +2446,355 @@ class MATERIAL_TOOLS_OT_AutoLinkTextures(bpy.types.Operator):
     bl_label = "Auto Link Texture Map"
 
     def execute(self, context):
-        AutoLinkTexture.auto_link_textures()
+        try:
+            with Profiler.operator(self, context) as stats:
+                count, linked = AutoLinkTexture.auto_link_textures()
+        except (OSError, ValueError, re.error) as e:
+            self.report({'ERROR'}, f"Could not load auto-link rules: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Made {linked} texture links across {count} materials in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_PackORM(bpy.types.Operator):
+    bl_idname = "material_tools.pack_orm"
+    bl_label = "Pack ORM"
+    bl_description = "Pack matched AO, roughness and metalness maps into one texture next to the sources and relink it"
+
+    def execute(self, context):
+        try:
+            with Profiler.operator(self, context) as stats:
+                result = OrmPacker.pack_orm(context)
+        except (OSError, ValueError, re.error) as e:
+            self.report({'ERROR'}, f"Could not pack ORM textures: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, (f"Relinked {result['materials']} materials to ORM textures ({result['packed']} written, "
+                               f"{result['removed']} source images freed) in {stats['seconds']:.2f}s"))
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_GenerateTextureProxies(bpy.types.Operator):
+    bl_idname = "material_tools.generate_texture_proxies"
+    bl_label = "Generate Proxies"
+    bl_description = "Write downscaled copies of the images used by the materials in scope"
+
+    def execute(self, context):
+        try:
+            with Profiler.operator(self, context) as stats:
+                result = TextureProxies.generate_proxies(context)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Could not generate proxies: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Proxies ready for {result['images']} images ({result['written']} written) in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_ToggleTextureProxies(bpy.types.Operator):
+    bl_idname = "material_tools.toggle_texture_proxies"
+    bl_label = "Toggle Proxies"
+    bl_description = "Switch every image with a proxy between the proxy and the full resolution file, saved files always keep full resolution paths"
+
+    def execute(self, context):
+        material_tools = context.scene.material_tools
+        with Profiler.operator(self, context) as stats:
+            material_tools.use_texture_proxies = not material_tools.use_texture_proxies
+            swapped = TextureProxies.swap(material_tools.use_texture_proxies)
+        state = "proxies" if material_tools.use_texture_proxies else "full resolution"
+        self.report({'INFO'}, f"Switched {len(swapped)} images to {state} in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_RenderFullResolution(bpy.types.Operator):
+    bl_idname = "material_tools.render_full_resolution"
+    bl_label = "Render Full Resolution"
+    bl_description = "Switch proxies to full resolution, render, and switch back when the render ends"
+
+    animation: bpy.props.BoolProperty(name="Animation", default=False)
+
+    def execute(self, context):
+        # Background renders block, so the switch back can happen right here
+        swapped = TextureProxies.swap(False)
+        try:
+            bpy.ops.render.render(animation=self.animation)
+        finally:
+            TextureProxies.swap(True, swapped)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        if not proxy_render["done"]:
+            self.report({'ERROR'}, "A full resolution render is already running")
+            return {'CANCELLED'}
+        # Swapping here, on the main thread, instead of in render handlers that run on the render job thread
+        proxy_render["images"] = [image.name for image in TextureProxies.swap(False)]
+        proxy_render["done"] = False
+        if 'CANCELLED' in bpy.ops.render.render('INVOKE_DEFAULT', animation=self.animation):
+            self.restore()
+            return {'CANCELLED'}
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.25, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type != 'TIMER' or not proxy_render["done"]:
+            return {'PASS_THROUGH'}
+        context.window_manager.event_timer_remove(self.timer)
+        self.restore()
+        return {'FINISHED'}
+
+    def restore(self):
+        images = bpy.data.images
+        TextureProxies.swap(True, [images[name] for name in proxy_render["images"] if name in images])
+        proxy_render["images"] = []
+        proxy_render["done"] = True
+
+class MATERIAL_TOOLS_OT_BuildTexturesFromDirectory(bpy.types.Operator):
+    bl_idname = "material_tools.build_textures_from_directory"
+    bl_label = "Build Textures From Folder"
+
+    def execute(self, context):
+        root = context.scene.material_tools.texture_root
+        if not root or not os.path.isdir(bpy.path.abspath(root)):
+            self.report({'ERROR'}, "Texture folder not found.")
+            return {'CANCELLED'}
+        try:
+            with Profiler.operator(self, context) as stats:
+                result = TextureDirectoryIndex.build_textures_from_directory(context, root)
+        except (OSError, ValueError, re.error) as e:
+            self.report({'ERROR'}, f"Could not build textures: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, (f"Added {result['nodes']} image nodes ({result['images']} images loaded) to "
+                               f"{result['materials']} materials from {result['files']} files, "
+                               f"{result['rescanned']} folders rescanned, in {stats['seconds']:.2f}s"))
         return {'FINISHED'}
 
+class MATERIAL_TOOLS_OT_ExportAssignments(bpy.types.Operator):
+    bl_idname = "material_tools.export_assignments"
+    bl_label = "Export Assignments"
+    bl_description = "Save every mesh object's material slots and face material indices"
+
+    def execute(self, context):
+        try:
+            with Profiler.operator(self, context) as stats:
+                result = AssignmentManifest.export_assignments(context.scene.material_tools.manifest_path)
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not export assignments: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, (f"Exported {result['objects']} objects and {result['meshes']} meshes "
+                               f"({result['bytes'] / (1 << 20):.1f} MB of face indices) in {stats['seconds']:.2f}s"))
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_ImportAssignments(bpy.types.Operator):
+    bl_idname = "material_tools.import_assignments"
+    bl_label = "Import Assignments"
+    bl_description = "Restore material slots and face material indices for objects matched by name"
+
+    def execute(self, context):
+        material_tools = context.scene.material_tools
+        try:
+            with Profiler.operator(self, context) as stats:
+                result = AssignmentManifest.import_assignments(context, material_tools.manifest_path, material_tools.manifest_selected_only)
+        except (OSError, ValueError, KeyError) as e:
+            self.report({'ERROR'}, f"Could not import assignments: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Restored {result['objects']} objects and {result['meshes']} meshes in {stats['seconds']:.2f}s")
+        if result["mismatched"] or result["missing"]:
+            self.report({'WARNING'}, (f"{result['mismatched']} meshes changed topology and kept their face indices, "
+                                      f"{result['missing']} materials were not found"))
+        return {'FINISHED'}
+
+# Subclasses define prepare(context) -> sorted item names, process(context, name) for one item and
+# finish(context) -> report message. checkpoint_state and resume carry extra state across an interruption.
+class ChunkedOperator:
+    def checkpoint_state(self):
+        return {}
+
+    def resume(self, state):
+        pass
+
+    def execute(self, context):
+        try:
+            with Profiler.operator(self, context) as stats:
+                for name in self.prepare(context):
+                    self.process(context, name)
+                message = self.finish(context)
+        except (OSError, ValueError, re.error) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{message} in {stats['seconds']:.2f}s")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        self.run, self.profile = Profiler.begin(self, context)
+        try:
+            with Profiler.active(self.run, self.profile):
+                self.items = self.prepare(context)
+        except (OSError, ValueError, re.error) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        # The checkpoint lives in the scene, so it is only there if the partial work was saved with it
+        self.signature = hashlib.sha1("\n".join(self.items).encode()).hexdigest()
+        checkpoint = context.scene.get(CHECKPOINT_PROPERTY, {}).get(self.bl_idname)
+        resumed = bool(context.scene.material_tools.chunk_resume and checkpoint and checkpoint.get("signature") == self.signature)
+        self.position = checkpoint["position"] if resumed else 0
+        if resumed:
+            self.resume(checkpoint.get("state", {}))
+        self.chunk = 1
+        self.started = self.saved = time.perf_counter()
+        wm = context.window_manager
+        wm.progress_begin(0, max(1, len(self.items)))
+        self.timer = wm.event_timer_add(0.001, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            return self.stop(context, None)
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        end = min(len(self.items), self.position + self.chunk)
+        start = time.perf_counter()
+        try:
+            with Profiler.active(self.run, self.profile):
+                for name in self.items[self.position:end]:
+                    self.process(context, name)
+        except Exception as e:
+            return self.stop(context, None, e)
+        count = max(1, end - self.position)
+        self.position = end
+        # Rewriting the checkpoint grows with the state, so it is written once per interval and counted in the chunk time
+        if time.perf_counter() - self.saved >= CHECKPOINT_INTERVAL:
+            self.save_checkpoint(context)
+            self.saved = time.perf_counter()
+        per_item = (time.perf_counter() - start) / count
+        context.window_manager.progress_update(self.position)
+        # Double the chunk while it stays under budget, shrink it straight away when it goes over
+        budget = context.scene.material_tools.chunk_budget_ms / 1000
+        self.chunk = max(1, min(self.chunk * 2, int(budget / per_item) if per_item else self.chunk * 2))
+        if self.position < len(self.items):
+            return {'RUNNING_MODAL'}
+        try:
+            with Profiler.active(self.run, self.profile):
+                message = self.finish(context)
+        except Exception as e:
+            return self.stop(context, None, e)
+        self.clear_checkpoint(context)
+        return self.stop(context, message)
+
+    def save_checkpoint(self, context):
+        checkpoints = context.scene.get(CHECKPOINT_PROPERTY)
+        checkpoints = checkpoints.to_dict() if checkpoints else {}
+        checkpoints[self.bl_idname] = {"signature": self.signature, "position": self.position, "state": self.checkpoint_state()}
+        context.scene[CHECKPOINT_PROPERTY] = checkpoints
+
+    def clear_checkpoint(self, context):
+        checkpoints = context.scene.get(CHECKPOINT_PROPERTY)
+        if checkpoints and self.bl_idname in checkpoints:
+            del checkpoints[self.bl_idname]
+
+    def stop(self, context, message, error=None):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        self.run["wall_seconds"] = time.perf_counter() - self.started
+        self.run["counters"]["items processed"] = self.position
+        Profiler.end(self, context, self.run, self.profile)
+        if error is not None:
+            # The position still points at the failed chunk, so a rerun retries it
+            self.save_checkpoint(context)
+            self.report({'ERROR'}, f"Stopped after {self.position} of {len(self.items)} items: {error}")
+            return {'CANCELLED'}
+        if message is None:
+            self.save_checkpoint(context)
+            self.report({'WARNING'}, f"Cancelled after {self.position} of {len(self.items)} items, run again to resume")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{message} in {self.run['wall_seconds']:.2f}s")
+        return {'FINISHED'}
+
+class MATERIAL_TOOLS_OT_RemoveUnusedMaterialSlotsChunked(ChunkedOperator, bpy.types.Operator):
+    bl_idname = "material_tools.remove_unused_material_slots_chunked"
+    bl_label = "Remove Unused Material Slots (Chunked)"
+
+    def prepare(self, context):
+        self.removed = 0
+        self.candidates = set()
+        return sorted(obj.name for obj, users in MaterialUsageIndex.dirty_selection())
+
+    def process(self, context, name):
+        obj = bpy.data.objects.get(name)
+        if obj and obj.type == 'MESH':
+            materials = set()
+            self.removed += RemoveUnusedData.clean_object_slots(obj, materials, MaterialUsageIndex.users(obj.data))
+            self.candidates.update(mat.name for mat in materials)
+
+    def checkpoint_state(self):
+        return {"removed": self.removed, "candidates": sorted(self.candidates)}
+
+    def resume(self, state):
+        self.removed = state.get("removed", 0)
+        self.candidates = set(state.get("candidates", ()))
+
+    def finish(self, context):
+        materials = bpy.data.materials
+        orphans = RemoveUnusedData.remove_orphan_materials([materials[n] for n in self.candidates if n in materials])
+        return f"Removed {self.removed} unused material slots and {orphans} orphan materials"
+
+class MATERIAL_TOOLS_OT_DeleteUnusedUVMapChunked(ChunkedOperator, bpy.types.Operator):
+    bl_idname = "material_tools.delete_unused_uv_map_chunked"
+    bl_label = "Delete Unused UV Map (Chunked)"
+
+    def prepare(self, context):
+        self.removed = 0
+        meshes = RemoveUnusedData.selected_uv_meshes(context)
+        self.referenced = {mesh.name: refs for mesh, refs in RemoveUnusedData.collect_uv_references(meshes).items()}
+        return sorted(self.referenced)
+
+    def process(self, context, name):
+        mesh = bpy.data.meshes.get(name)
+        if mesh and mesh.uv_layers:
+            self.removed += RemoveUnusedData.clean_uv_layers(mesh, self.referenced[name])
+
+    def checkpoint_state(self):
+        return {"removed": self.removed}
+
+    def resume(self, state):
+        self.removed = state.get("removed", 0)
+
+    def finish(self, context):
+        return f"Removed {self.removed} unused UV maps"
+
+class MATERIAL_TOOLS_OT_AutoLinkTexturesChunked(ChunkedOperator, bpy.types.Operator):
+    bl_idname = "material_tools.auto_link_textures_chunked"
+    bl_label = "Auto Link Texture Map (Chunked)"
+
+    def prepare(self, context):
+        material_tools = context.scene.material_tools
+        self.rules = AutoLinkTexture.compile_rules(material_tools)
+        self.cache = {}
+        self.linked = 0
+        materials = AutoLinkTexture.materials_in_scope(context, material_tools.auto_link_scope)
+        Profiler.count("materials", len(materials))
+        return sorted(mat.name for mat in materials)
+
+    def process(self, context, name):
+        material = bpy.data.materials.get(name)
+        if material:
+            self.linked += AutoLinkTexture.link_textures_to_principled(material, self.rules, self.cache)
+
+    def checkpoint_state(self):
+        return {"linked": self.linked}
+
+    def resume(self, state):
+        self.linked = state.get("linked", 0)
+
+    def finish(self, context):
+        Profiler.count("links", self.linked)
+        return f"Made {self.linked} texture links"
+
 class MATERIAL_TOOLS_OT_ResetAutoLinkSuffixes(bpy.types.Operator):
     bl_idname = "material_tools.reset_auto_link_suffixes"
     bl_label = "Reset Suffixes to Default"
 
     def execute(self, context):
         material_tools = context.scene.material_tools
-        material_tools.base_color_suffix = "_albedo"
-        material_tools.roughness_suffix = "_roughness"
-        material_tools.metalness_suffix = "_metalness"
-        material_tools.normal_suffix = "_normal"
-        material_tools.emissive_suffix = "_emissive"
-        material_tools.alpha_suffix = "_alpha"
+        for channel, suffix in AUTO_LINK_DEFAULT_SUFFIXES.items():
+            setattr(material_tools, f"{channel}_suffix", suffix)
         self.report({'INFO'}, "Auto-link suffixes reset to default values.")
         return {'FINISHED'}
 
@@ -277,28 +2802,123 @@ classes = (
     MATERIAL_TOOLS_Properties,
     MATERIAL_TOOLS_PT_Panel,
     MATERIAL_TOOLS_OT_DeleteDuplicateMaterials,
+    MATERIAL_TOOLS_OT_DeduplicateMaterialsByContent,
+    MATERIAL_TOOLS_OT_DeduplicateImages,
     MATERIAL_TOOLS_OT_DeleteUnusedUVMap,
     MATERIAL_TOOLS_OT_RemoveUnusedMaterialSlots,
+    MATERIAL_TOOLS_OT_RemoveOrphanMaterials,
+    MATERIAL_TOOLS_OT_CollectGarbage,
+    MATERIAL_TOOLS_OT_ExportAssignments,
+    MATERIAL_TOOLS_OT_ImportAssignments,
+    MATERIAL_TOOLS_OT_PlanCleanup,
+    MATERIAL_TOOLS_OT_ApplyCleanupPlan,
     MATERIAL_TOOLS_OT_RandomMaterial,
     MATERIAL_TOOLS_OT_AutoLinkTextures,
+    MATERIAL_TOOLS_OT_BuildTexturesFromDirectory,
+    MATERIAL_TOOLS_OT_PackORM,
+    MATERIAL_TOOLS_OT_GenerateTextureProxies,
+    MATERIAL_TOOLS_OT_ToggleTextureProxies,
+    MATERIAL_TOOLS_OT_RenderFullResolution,
+    MATERIAL_TOOLS_OT_RemoveUnusedMaterialSlotsChunked,
+    MATERIAL_TOOLS_OT_DeleteUnusedUVMapChunked,
+    MATERIAL_TOOLS_OT_AutoLinkTexturesChunked,
     MATERIAL_TOOLS_OT_ResetAutoLinkSuffixes,
 )
 
+@persistent
+def material_tools_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        id_data = update.id.original
+        # Moving objects or changing add-on settings does not change what a cleanup would do
+        if isinstance(id_data, bpy.types.Object) and update.is_updated_transform and not update.is_updated_geometry:
+            pass
+        elif isinstance(id_data, (bpy.types.Object, bpy.types.Mesh, bpy.types.Material, bpy.types.NodeTree)):
+            CleanupPlanner.revision += 1
+        if isinstance(id_data, bpy.types.Material):
+            material_fingerprints.pop(id_data.as_pointer(), None)
+        elif isinstance(id_data, bpy.types.Mesh):
+            MaterialUsageIndex.mark_mesh(id_data)
+        elif isinstance(id_data, bpy.types.Object) and id_data.type == 'MESH':
+            if update.is_updated_geometry:
+                MaterialUsageIndex.mark_mesh(id_data.data)
+            if update.is_updated_geometry or not update.is_updated_transform:
+                # New objects, a swapped mesh or a changed object-linked slot
+                MaterialUsageIndex.mark_object(id_data)
+        elif isinstance(id_data, bpy.types.NodeTree) and getattr(id_data, "is_embedded_data", False):
+            # Ramp and curve edits may only tag the embedded tree, not the material that owns it
+            for mat in bpy.data.materials:
+                if mat.node_tree == id_data:
+                    material_fingerprints.pop(mat.as_pointer(), None)
+        elif isinstance(id_data, (bpy.types.Image, bpy.types.NodeTree)):
+            # Shared images and node groups can feed any number of materials
+            material_fingerprints.clear()
+
+@persistent
+def material_tools_reset_caches(*args):
+    material_fingerprints.clear()
+    MaterialUsageIndex.clear()
+    CleanupPlanner.plan = None
+
+@persistent
+def material_tools_load_post(*args):
+    material_tools_reset_caches()
+    MaterialUsageIndex.build()
+
+@persistent
+def material_tools_render_done(*args):
+    # Runs on the render thread for interactive renders, so it only raises a flag for the operator
+    proxy_render["done"] = True
+
+@persistent
+def material_tools_save_pre(*args):
+    TextureProxies.before_save()
+
+@persistent
+def material_tools_save_post(*args):
+    TextureProxies.after_save()
+
+handlers = (
+    ("depsgraph_update_post", material_tools_depsgraph_update),
+    ("load_post", material_tools_load_post),
+    ("undo_post", material_tools_reset_caches),
+    ("redo_post", material_tools_reset_caches),
+    ("render_complete", material_tools_render_done),
+    ("render_cancel", material_tools_render_done),
+    ("save_pre", material_tools_save_pre),
+    ("save_post", material_tools_save_post),
+)
+
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    for name, handler in handlers:
+        getattr(bpy.app.handlers, name).append(handler)
     bpy.types.Scene.material_tools = bpy.props.PointerProperty(type=MATERIAL_TOOLS_Properties)
     bpy.types.Scene.remove_unused_data_expand = bpy.props.BoolProperty(default=False)
     bpy.types.Scene.random_material_expand = bpy.props.BoolProperty(default=False)
+    bpy.types.Material.random_weight = bpy.props.FloatProperty(
+        name="Random Weight",
+        description="Relative chance of this material in random assignment",
+        default=1.0,
+        min=0.0
+    )
     bpy.types.Scene.auto_link_texture_expand = bpy.props.BoolProperty(default=False)
+    bpy.types.Scene.stats_expand = bpy.props.BoolProperty(default=False)
+    bpy.types.Scene.assignments_expand = bpy.props.BoolProperty(default=False)
 
 def unregister():
+    for name, handler in handlers:
+        if handler in getattr(bpy.app.handlers, name):
+            getattr(bpy.app.handlers, name).remove(handler)
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.material_tools
     del bpy.types.Scene.remove_unused_data_expand
     del bpy.types.Scene.random_material_expand
+    del bpy.types.Material.random_weight
     del bpy.types.Scene.auto_link_texture_expand
+    del bpy.types.Scene.stats_expand
+    del bpy.types.Scene.assignments_expand
 
 if __name__ == "__main__":
     register()
\ No newline at end of file
@@ -1,47 +1,28 @@
 import bpy
+import numpy as np
 
-def merge_duplicate_materials(obj):
+def merge_duplicate_materials(obj, users):
     if obj.type != 'MESH':
         return
 
-    # Dictionary to store unique materials
-    unique_materials = {}
-    material_mapping = {}
-
-    # First pass: identify unique materials and create mapping
-    for slot in obj.material_slots:
-        if slot.material:
-            if slot.material.name not in unique_materials:
-                unique_materials[slot.material.name] = slot.material
-            material_mapping[slot.material] = unique_materials[slot.material.name]
-
-    # Second pass: update material slots and face assignments
-    for i, slot in enumerate(obj.material_slots):
-        if slot.material:
-            obj.material_slots[i].material = material_mapping[slot.material]
-
-    if obj.data.materials:
-        for i, mat in enumerate(obj.data.materials):
-            if mat:
-                obj.data.materials[i] = material_mapping[mat]
-
-    # Update face material indices
-    if obj.data.polygons:
-        for poly in obj.data.polygons:
-            old_mat = obj.data.materials[poly.material_index]
-            new_mat = material_mapping[old_mat]
-            poly.material_index = obj.data.materials.find(new_mat.name)
-
-    # Remove unused materials from the object
-    used_materials = set(material_mapping.values())
-    for i in range(len(obj.material_slots) - 1, -1, -1):
-        if obj.material_slots[i].material not in used_materials:
-            obj.data.materials.pop(index=i)
+    mesh = obj.data
+    materials = list(mesh.materials)
+
+    # Object-linked slots can differ per object, so a slot key holds what every object using the mesh shows
+    keys = [tuple([mat] + [user.material_slots[i].material if i < len(user.material_slots) else None for user in users])
+            for i, mat in enumerate(materials)]
+
+    # Slot-level remap table: every slot points at the first slot holding the same material
+    first_slot = {}
+    slot_remap = np.array([first_slot.setdefault(key, i) for i, key in enumerate(keys)], dtype=np.int32)
 
-    # Remove unused materials from the blend file
-    for mat in bpy.data.materials:
-        if mat not in used_materials and mat.users == 0:
-            bpy.data.materials.remove(mat)
+    # Update face material indices with one bulk read, one table lookup and one bulk write
+    if len(materials) > 1 and mesh.polygons:
+        indices = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", indices)
+        np.clip(indices, 0, len(materials) - 1, out=indices)
+        mesh.polygons.foreach_set("material_index", slot_remap[indices])
+        mesh.update()
 
     print(f"Merged duplicate materials for object: {obj.name}")
 
@@ -49,8 +30,11 @@ def remove_unused_material_slots(obj):
     if obj.type != 'MESH':
         return
 
-    # Get a set of material indices actually used by the mesh
-    used_indices = set(poly.material_index for poly in obj.data.polygons)
+    # Get a set of material indices actually used by the mesh with one bulk read
+    polygons = obj.data.polygons
+    indices = np.empty(len(polygons), dtype=np.int32)
+    polygons.foreach_get("material_index", indices)
+    used_indices = set(np.unique(indices).tolist())
 
     # Remove material slots that are not used
     for i in range(len(obj.material_slots) - 1, -1, -1):
@@ -59,18 +43,35 @@ def remove_unused_material_slots(obj):
 
     print(f"Removed unused material slots for object: {obj.name}")
 
+def remove_orphan_materials():
+    # Remove materials no longer used anywhere in the blend file
+    orphans = [mat for mat in bpy.data.materials if mat.users == 0]
+    if orphans:
+        bpy.data.batch_remove(orphans)
+    print(f"Removed {len(orphans)} orphan materials.")
+
 # Get all selected objects
 selected_objects = bpy.context.selected_objects
 
+# Objects sharing each selected mesh, gathered in one pass over the file
+selected_meshes = {obj.data for obj in selected_objects if obj.type == 'MESH'}
+mesh_users = {}
+for obj in bpy.data.objects:
+    if obj.type == 'MESH' and obj.data in selected_meshes:
+        mesh_users.setdefault(obj.data, []).append(obj)
+
 # Process each selected object
 for obj in selected_objects:
     if obj.type == 'MESH':
         # Merge duplicate materials for the object
-        merge_duplicate_materials(obj)
+        merge_duplicate_materials(obj, mesh_users[obj.data])
 
         # Remove unused material slots
         remove_unused_material_slots(obj)
     else:
         print(f"Skipped non-mesh object: {obj.name}")
 
+# Sweep orphans once, after every object has dropped its duplicate slots
+remove_orphan_materials()
+
 print("Finished processing all selected objects.")